@@ -1,6 +1,6 @@
 import inspect
 from os import listdir
-from os.path import join
+from os.path import join, isdir
 import importlib
 from zs2.entities import Entity
 from zs2.context import ApplicationInterface
@@ -22,6 +22,10 @@ def get_methods_from_module(module):
 
 def get_modules_from_directory(directory):
     path = join("app", directory)
+    # apps without e.g. custom layers only get the default classes
+    if not isdir(path):
+        return []
+
     file_names = listdir(path)
     file_names = list(filter(
         lambda f: f not in ("__pycache__", "__init__.py"),
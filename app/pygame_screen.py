@@ -1,25 +1,117 @@
 import pygame
 
 from zs2.game import Screen
-from zs2.resources import Image
+from zs2.resources import Image, convert_images
 from zs_constants import Settings
 
 
 class PygameScreen(Screen):
-    def __init__(self):
-        self._screen = pygame.display.set_mode(Settings.SCREEN_SIZE)
+    def __init__(self, batch=Settings.BATCH_RENDER, dirty_rects=Settings.DIRTY_RECTS):
+        self._screen = None
+        self.set_mode(Settings.SCREEN_SIZE)
 
-    def refresh(self):
+        # batch mode submits runs of image commands with one
+        #   Surface.blits call, reusing the batches while the
+        #   environment returns the same retained render list
+        self.batch = batch
+        self._graphics = None
+        self._batches = []
+
+        # dirty rect mode compares each frame's draw commands to the
+        #   last frame's and only clears, redraws and updates the
+        #   regions that changed
+        self.dirty_rects = dirty_rects
+        self._commands = []
+
+    def set_mode(self, size, *args):
+        self._screen = pygame.display.set_mode(size, *args)
+        self._graphics = None
+
+        # cached images are converted to the new display format
+        convert_images()
+
+    @staticmethod
+    def handle_events():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 exit()
 
+    def refresh(self):
+        self.handle_events()
+
         pygame.display.flip()
         self._screen.fill((0, 0, 0))
 
+    def draw(self, environment):
+        if self.dirty_rects:
+            self.draw_dirty_rects(environment)
+
+        elif not self.batch:
+            super(PygameScreen, self).draw(environment)
+
+        else:
+            self.refresh()
+
+            graphics = environment.get_graphics()
+            if graphics is not self._graphics:
+                self._graphics = graphics
+                self._batches = get_batches(graphics)
+
+            render_batches(self._screen, self._batches)
+
     def render_graphics(self, image, *args):
         render_graphics(self._screen, image, *args)
 
+    def draw_dirty_rects(self, environment):
+        self.handle_events()
+        screen = self._screen
+
+        graphics = environment.get_graphics()
+        if graphics is self._graphics:
+            return
+
+        first_frame = self._graphics is None
+        self._graphics = graphics
+
+        # commands = [(key, rect), ...]
+        #   key is the image command itself, or None for geometry
+        #   commands which are always treated as changed
+        commands = []
+        for args in graphics:
+            key = None
+            if type(args[0]) is Image:
+                key = args
+
+            commands.append((key, get_bounding_rect(*args)))
+
+        if first_frame:
+            screen.fill((0, 0, 0))
+            for args in graphics:
+                render_graphics(screen, *args)
+
+            pygame.display.flip()
+
+        else:
+            old = set(key for key, rect in self._commands)
+            new = set(key for key, rect in commands)
+
+            dirty = [rect for key, rect in self._commands if key is None or key not in new]
+            dirty += [rect for key, rect in commands if key is None or key not in old]
+            dirty = merge_rects(dirty, screen.get_rect())
+
+            for region in dirty:
+                screen.set_clip(region)
+                screen.fill((0, 0, 0))
+
+                for args, (key, rect) in zip(graphics, commands):
+                    if rect.colliderect(region):
+                        render_graphics(screen, *args)
+
+            screen.set_clip(None)
+            pygame.display.update(dirty)
+
+        self._commands = commands
+
 
 def render_graphics(screen, image, *args):
     if type(image) is Image:
@@ -30,15 +122,94 @@ def render_graphics(screen, image, *args):
         render_geometry(screen, image, *args)
 
 
-def render_geometry(screen, method, *args):
-    if method == "rect":
-        args = list(args)
-        args[1] = args[1].pygame_rect
+def get_bounding_rect(image, *args):
+    if type(image) is Image:
+        return pygame.Rect(args[0], image.get_size())
 
-        pygame.draw.rect(screen, *args)
+    if image == "rect":
+        return args[1].pygame_rect
 
-    if method == "line":
-        pygame.draw.line(screen, *args)
+    if image == "line":
+        start, end, width = args[1:4]
+        rect = pygame.Rect(start, (0, 0))
+        rect.union_ip(pygame.Rect(end, (0, 0)))
 
-    if method == "circle":
-        pygame.draw.circle(screen, *args)
+        return rect.inflate(width + 2, width + 2)
+
+    if image == "circle":
+        (x, y), radius = args[1:3]
+
+        return pygame.Rect(x - radius, y - radius, radius * 2, radius * 2)
+
+
+def merge_rects(rects, bounds):
+    """
+    clips rects to bounds and merges any that overlap
+    """
+    merged = []
+
+    for r in rects:
+        r = r.clip(bounds)
+        if not (r.w and r.h):
+            continue
+
+        i = r.collidelist(merged)
+        while i != -1:
+            r = r.union(merged.pop(i))
+            i = r.collidelist(merged)
+
+        merged.append(r)
+
+    return merged
+
+
+def get_batches(graphics):
+    """
+    groups consecutive image commands into (None, blit_sequence) items
+      for Surface.blits, geometry commands become (method, args) items
+    """
+    batches = []
+    blits = None
+
+    for args in graphics:
+        image = args[0]
+
+        if type(image) is Image:
+            if blits is None:
+                blits = []
+                batches.append((None, blits))
+
+            blits.append((image.pygame_surface, args[1]))
+
+        else:
+            blits = None
+            batches.append((image, args[1:]))
+
+    return batches
+
+
+def render_batches(screen, batches):
+    blits = screen.blits
+
+    for method, args in batches:
+        if method is None:
+            blits(args, False)
+
+        else:
+            render_geometry(screen, method, *args)
+
+
+def render_rect(screen, color, rect, *args):
+    pygame.draw.rect(screen, color, rect.pygame_rect, *args)
+
+
+GEOMETRY_METHODS = {
+    "rect": render_rect,
+    "line": pygame.draw.line,
+    "circle": pygame.draw.circle
+}
+
+
+def render_geometry(screen, method, *args):
+    if method in GEOMETRY_METHODS:
+        GEOMETRY_METHODS[method](screen, *args)
@@ -0,0 +1,388 @@
+import os
+import json
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")     # no display needed
+
+import pygame
+
+from app.get_context import get_context_classes
+from zs2.context import Context
+from zs2.entities import Entity, Sprite
+from zs2.game import Game, Screen
+from zs2.profiling import Profiler
+from zs2.resources import load_resource
+from zs2.snapshots import save_snapshot, load_snapshot_file
+from zs2.zson import get_zson_data, format_zson, save_zson, load_zson, save_json, load_json
+from zs_constants import Settings
+
+PERCENTILES = 50, 90, 99
+TIME_KEYS = ("mean", "max") + tuple("p{}".format(p) for p in PERCENTILES)
+
+
+def get_percentile(values, p):
+    """
+    nearest rank percentile of a sorted list of values
+    """
+    i = round((p / 100) * (len(values) - 1))
+
+    return values[i]
+
+
+def get_stats(times):
+    """
+    summarizes a list of times in seconds as millisecond statistics
+    """
+    values = sorted(times)
+    stats = {
+        "mean": 1000 * sum(values) / len(values),
+        "max": 1000 * values[-1]
+    }
+
+    for p in PERCENTILES:
+        stats["p{}".format(p)] = 1000 * get_percentile(values, p)
+
+    return stats
+
+
+def print_stats(title, stats):
+    print("\n" + title)
+
+    for name in stats:
+        line = ", ".join(
+            "{}: {:.3f}{}".format(k, v, "ms" if k in TIME_KEYS else "")
+            for k, v in stats[name].items()
+        )
+        print("\t{}: {}".format(name, line))
+
+
+class BenchmarkScreen(Screen):
+    # Null screen that records how long the graphics phases of each
+    #   frame take without drawing anything
+    def __init__(self):
+        self.times = {
+            "graphics": [],
+            "render": []
+        }
+
+    def draw(self, environment):
+        self.refresh()
+
+        start = perf_counter()
+        graphics = environment.get_graphics()
+        mid = perf_counter()
+
+        for args in graphics:
+            self.render_graphics(*args)
+        end = perf_counter()
+
+        self.times["graphics"].append(mid - start)
+        self.times["render"].append(end - mid)
+
+
+def run_environment(file_name, frames, profiler=None):
+    """
+    runs an environment headlessly for a number of frames and returns
+      timing statistics for the update, graphics and render phases
+    """
+    pygame.display.set_mode((1, 1))        # for Surface.convert()
+
+    screen = BenchmarkScreen()
+    game = Game(screen, None, Settings.FRAME_RATE)
+
+    entities, interfaces = get_context_classes()
+    class_dict = {
+        cls.__name__: cls for cls in entities
+    }
+    context = Context(game, class_dict, *interfaces)
+    context.load_environment(load_resource(file_name))
+    context.model["dt"] = 1 / Settings.FRAME_RATE
+
+    if profiler:
+        profiler.enable()
+
+    update_times = []
+    for i in range(frames):
+        start = perf_counter()
+        game.update_environment()
+        update_times.append(perf_counter() - start)
+
+        game.draw_environment()
+
+    if profiler:
+        profiler.disable()
+
+    times = {"update": update_times}
+    times.update(screen.times)
+    frame_times = [sum(t) for t in zip(*times.values())]
+    times["frame"] = frame_times
+
+    return {name: get_stats(times[name]) for name in times}
+
+
+def get_zson_text(size):
+    """
+    generates roughly 'size' bytes of ZSON formatted level data
+    """
+    lines = []
+    length = 0
+    i = 0
+
+    while length < size:
+        if not i % 1000:
+            lines.append("# section_{}\n".format(i // 1000))
+
+        item = [
+            "tile_{}".format(i),
+            "\tposition: {}, {}".format(i % 64, i // 64),
+            "\tsize: 16, 16",
+            "\timage: tiles.png",
+            "\tsolid: {}".format(["true", "false"][i % 2]),
+            "\tvisible",
+            ""
+        ]
+        i += 1
+
+        for line in item:
+            lines.append(line)
+            length += len(line) + 1
+
+    return "\n".join(lines)
+
+
+def run_zson(sizes, repeat=3):
+    """
+    times get_zson_data on generated ZSON text of each size in MB
+    """
+    results = {}
+
+    for size in sizes:
+        text = get_zson_text(int(size * 1024 * 1024))
+        times = []
+
+        for i in range(repeat):
+            start = perf_counter()
+            get_zson_data(text)
+            times.append(perf_counter() - start)
+
+        stats = get_stats(times)
+        stats["MB/s"] = size / (stats["mean"] / 1000)
+        results["{}MB".format(size)] = stats
+
+    return results
+
+
+def get_game_state(size):
+    """
+    generates a ZSON congruent game state dump with 'size' sprites
+    """
+    sprites = {}
+
+    for i in range(size):
+        sprites["sprite_{}".format(i)] = {
+            "class": "Sprite",
+            "group": "group_{}".format(i % 10),
+            "position": [i % 800, i // 800],
+            "size": [16, 16],
+            "visible": bool(i % 2),
+            "paused": False,
+            "controller": None
+        }
+
+    return {
+        "layers": {"environment": {"class": "Layer", "size": [800, 600]}},
+        "sprites": sprites
+    }
+
+
+def run_zson_write(sizes, repeat=3):
+    """
+    times format_zson and save_zson on generated game states and checks
+      that each one loads back unchanged
+    """
+    results = {}
+    path = os.path.join(tempfile.mkdtemp(), "state.zson")
+
+    for size in sizes:
+        state = get_game_state(size)
+
+        for name, method in (
+                ("format_zson", lambda: format_zson(state)),
+                ("save_zson", lambda: save_zson(state, path))):
+            times = []
+
+            for i in range(repeat):
+                start = perf_counter()
+                method()
+                times.append(perf_counter() - start)
+
+            results["{} {} sprites".format(name, size)] = get_stats(times)
+
+        if load_zson(path) != state:
+            raise ValueError("ZSON round trip failed for {} sprites".format(size))
+
+    os.remove(path)
+
+    return results
+
+
+def run_snapshot(sizes, repeat=3):
+    """
+    times saving and loading generated game states as JSON and as
+      binary snapshots, and compares the file sizes
+    """
+    results = {}
+    directory = tempfile.mkdtemp()
+    json_path = os.path.join(directory, "state.json")
+    snapshot_path = os.path.join(directory, "state.snapshot")
+
+    for size in sizes:
+        state = get_game_state(size)
+        state = {
+            "layers": list(state["layers"].values()),
+            "sprites": list(state["sprites"].values())
+        }
+
+        for name, method in (
+                ("save_json", lambda: save_json(state, json_path)),
+                ("load_json", lambda: load_json(json_path)),
+                ("save_snapshot", lambda: save_snapshot(state, snapshot_path)),
+                ("load_snapshot", lambda: load_snapshot_file(snapshot_path))):
+            times = []
+
+            for i in range(repeat):
+                start = perf_counter()
+                method()
+                times.append(perf_counter() - start)
+
+            results["{} {} sprites".format(name, size)] = get_stats(times)
+
+        if load_snapshot_file(snapshot_path) != load_json(json_path):
+            raise ValueError("snapshot round trip failed for {} sprites".format(size))
+
+        results["size {} sprites".format(size)] = {
+            "json KB": os.path.getsize(json_path) / 1024,
+            "snapshot KB": os.path.getsize(snapshot_path) / 1024
+        }
+
+    os.remove(json_path)
+    os.remove(snapshot_path)
+
+    return results
+
+
+class HasattrSprite(Sprite):
+    # Sprite with the hasattr() based change tracking that
+    #   Entity.__setattr__ used before TRACKED_ATTRS, as a baseline
+    def __setattr__(self, key, value):
+        object.__setattr__(self, key, value)
+
+        if key in Entity.RENDER_ATTRS:
+            graphics = self.__dict__.get("graphics")
+            if graphics:
+                graphics.dirty = True
+
+        if hasattr(self, "set_" + key) and self.initialized:
+            if not (key == "parent_layer" and value == "environment"):
+                self.log_data(key, value)
+
+
+class PlainObject:
+    # no __setattr__ override, the cost of the assignment loop itself
+    def __init__(self, name):
+        self.name = name
+
+
+def run_setattr(count, repeat=5):
+    """
+    times attribute assignments on Sprites with and without tracking
+      and returns the mean cost of one assignment in nanoseconds
+    """
+    results = {}
+
+    for cls in (PlainObject, Sprite, HasattrSprite):
+        sprite = cls("sprite")
+
+        for key, value in (
+                ("event", None),                # untracked
+                ("position", (1, 2)),           # tracked and render
+                ("size", (16, 16))):            # tracked
+            times = []
+
+            for i in range(repeat):
+                start = perf_counter()
+                for j in range(count):
+                    setattr(sprite, key, value)
+                times.append(perf_counter() - start)
+
+            stats = get_stats(times)
+            stats["ns/set"] = 1000000 * stats["mean"] / count
+            results["{} {}".format(cls.__name__, key)] = stats
+
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="ZSquirrel headless benchmarks")
+    parser.add_argument("--json", help="save results to a .json file")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    env = sub.add_parser("env", help="run an environment for N frames")
+    env.add_argument("file_name", nargs="?", default=Settings.APP_START)
+    env.add_argument("frames", nargs="?", type=int, default=600)
+    env.add_argument("--profile", action="store_true",
+                     help="print per method timings")
+
+    zson = sub.add_parser("zson", help="parse generated ZSON files")
+    zson.add_argument("sizes", nargs="*", type=float, default=[1, 2, 4])
+
+    zson_write = sub.add_parser("zson_write", help="format and save generated game states")
+    zson_write.add_argument("sizes", nargs="*", type=int, default=[10000, 50000])
+
+    snapshot = sub.add_parser("snapshot", help="compare JSON and binary snapshot saves")
+    snapshot.add_argument("sizes", nargs="*", type=int, default=[10000, 50000])
+
+    setattr_parser = sub.add_parser("setattr", help="time Entity attribute assignment")
+    setattr_parser.add_argument("count", nargs="?", type=int, default=200000)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "env":
+        profiler = None
+        if args.profile:
+            profiler = Profiler(window=args.frames)
+
+        results = run_environment(args.file_name, args.frames, profiler)
+        print_stats("{} ({} frames)".format(
+            args.file_name, args.frames), results)
+
+        if profiler:
+            print("\nPROFILE")
+            profiler.print_report()
+
+    if args.benchmark == "zson":
+        results = run_zson(args.sizes)
+        print_stats("get_zson_data", results)
+
+    if args.benchmark == "zson_write":
+        results = run_zson_write(args.sizes)
+        print_stats("format_zson / save_zson", results)
+
+    if args.benchmark == "snapshot":
+        results = run_snapshot(args.sizes)
+        print_stats("JSON / snapshot", results)
+
+    if args.benchmark == "setattr":
+        results = run_setattr(args.count)
+        print_stats("Entity.__setattr__ ({} assignments)".format(args.count), results)
+
+    if args.json:
+        file = open(args.json, "w")
+        json.dump(results, file, indent=4)
+        file.close()
+
+
+if __name__ == "__main__":
+    main()
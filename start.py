@@ -15,7 +15,10 @@ pygame.init()
 if __name__ == "__main__":
     scr = PygameScreen()
     clock = pygame.time.Clock()
-    game = Game(scr, clock, Settings.FRAME_RATE)
+    game = Game(
+        scr, clock, Settings.FRAME_RATE,
+        Settings.UPDATE_RATE, Settings.MAX_UPDATE_STEPS
+    )
 
     env = load_resource(Settings.APP_START)
     entities, interfaces = get_context_classes()
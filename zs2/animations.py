@@ -1,3 +1,4 @@
+from bisect import bisect_left, bisect_right
 from copy import copy
 
 
@@ -11,35 +12,43 @@ class Animation:
 
         self.data = data
 
+        # cumulative step durations, used to look up steps by frame
+        self.step_ends = []
+        self.frame_count = 0
+        self.set_step_ends()
+
+    def set_step_ends(self):
+        total = 0
+        ends = []
+
+        for s in self.steps:
+            total += s.duration
+            ends.append(total)
+
+        self.step_ends = ends
+        self.frame_count = total
+
     # def add_step(self, duration, layers, data=None):
     #     self.steps.append(
     #         AnimationStep(duration, layers, data)
     #     )
 
+    # returns the first step that ends on or after frame_num
     def get_current_step(self, frame_num):
-        for s in self.steps:
-            d = s.duration
-            frame_num -= d
-            if frame_num <= 0:
-                return s
+        i = bisect_left(self.step_ends, frame_num)
 
-    def get_step_index(self, frame_num):
-        i = 0
-        for d in [s.duration for s in self.steps]:
-            frame_num -= d
+        if i < len(self.steps):
+            return self.steps[i]
 
-            if frame_num < 0:
-                return i
+    # returns the index of the step that frame_num falls within
+    def get_step_index(self, frame_num):
+        i = bisect_right(self.step_ends, frame_num)
 
-            i += 1
+        if i < len(self.steps):
+            return i
 
     def get_frame_count(self):
-        i = 0
-        for s in self.steps:
-            d = s.duration
-            i += d
-
-        return i
+        return self.frame_count
 
     def get_mirror_animation(self, name, mirror):
         new_steps = [
@@ -1,7 +1,10 @@
-from zs_constants import ZsData, ApiConstants
+from zs_constants import ZsData, ApiConstants, Settings
 from zs2.entities import Layer, Sprite
-from zs2.resources import load_resource
+from zs2.resources import load_resource, start_pinning, stop_pinning
 from zs2.collections import Group
+from zs2.preloading import Preloader
+from zs2.snapshots import save_snapshot, load_snapshot_file
+from zs2.deltas import DeltaRecorder
 
 DEFAULT_CLASSES = {
     ZsData.SPRITE: Sprite,
@@ -22,6 +25,10 @@ class Context:
         for i in interfaces:
             self.interfaces.append(i(self))
 
+        self.preloader = None
+        self.queued_environment = None      # PreloadJob
+        self.recorder = None
+
     def reset_model(self):
         if "environment" in self.model:
             env = self.model["environment"]
@@ -96,18 +103,81 @@ class Context:
             ZsData.SPRITES: sprites
         }
 
+    def save_snapshot(self, file_name):
+        """
+        saves the output of get_json() as a binary snapshot file
+        """
+        save_snapshot(self.get_json(), file_name)
+
+    def load_snapshot(self, file_name):
+        """
+        rebuilds the environment saved by save_snapshot()
+        """
+        self.load_environment(load_snapshot_file(file_name))
+
+    def start_recording(self, size=Settings.DELTA_BUFFER):
+        """
+        records a delta of the entity data changed by each update
+          of the environment, see zs2.deltas.DeltaRecorder
+        """
+        self.recorder = DeltaRecorder(self, size)
+
+        return self.recorder
+
+    def stop_recording(self):
+        self.recorder = None
+
     def get_layers(self):
         return [l for l in self.model.values() if isinstance(l, Layer)]
 
     def get_sprites(self):
         return [s for s in self.model.values() if isinstance(s, Sprite)]
 
+    def preload_environment(self, file_name):
+        """
+        starts loading the JSON and images an environment file references
+          on worker threads, returns a PreloadJob. Call its finish()
+          method on the main thread before loading the environment
+        """
+        if not self.preloader:
+            self.preloader = Preloader()
+
+        return self.preloader.preload(file_name)
+
+    def queue_environment(self, file_name):
+        """
+        preloads an environment while the current one keeps running.
+          Game.update_environment() loads it after the first update
+          that ends with preloading done
+        """
+        job = self.preload_environment(file_name)
+        self.queued_environment = job
+
+        return job
+
+    def load_queued_environment(self):
+        # called between environment updates, so the old environment
+        #   is never replaced part way through its update
+        job = self.queued_environment
+
+        if job and job.done():
+            self.queued_environment = None
+            job.finish()
+            self.load_environment(job.file_name)
+
     def load_environment(self, data):
         if type(data) is str:
             data = load_resource(data)
 
         self.reset_model()
-        self.populate(data)
+
+        # assets used by the new environment can't be evicted
+        start_pinning()
+        try:
+            self.populate(data)
+        finally:
+            stop_pinning()
+
         self.game.environment = self.model[ZsData.ENVIRONMENT]
 
     def populate(self, data):
@@ -183,6 +253,8 @@ class Context:
                 output.append(entity)
 
                 self.model[name] = entity
+                if self.recorder:
+                    self.recorder.add_entity(entity)
                 print("\nCreated new Entity:\n{}".format(entity))
 
         return output
@@ -0,0 +1,240 @@
+from collections import deque
+
+from zs_constants import ZsData, Settings
+from zs2.entities import Layer
+from zs2.snapshots import save_snapshot
+
+FRAME = "frame"
+CHANGED = "changed"
+BASE = "base"
+BASE_FRAME = "base_frame"
+DELTAS = "deltas"
+
+
+def get_section(entity):
+    if isinstance(entity, Layer):
+        return ZsData.LAYERS
+
+    return ZsData.SPRITES
+
+
+def get_data(data, keys=None):
+    """
+    copies zs_data items with tuples as lists, the way load_environment()
+      expects setter arguments
+    """
+    if keys is None:
+        keys = data
+
+    return {
+        key: list(data[key]) if type(data[key]) is tuple else data[key]
+        for key in keys
+    }
+
+
+def get_delta(frame):
+    """
+    a delta lists the zs_data of entities added since the last frame
+      recorded, by section, and the changed zs_data items of every
+      other entity by name
+    """
+    return {
+        FRAME: frame,
+        ZsData.LAYERS: [],
+        ZsData.SPRITES: [],
+        CHANGED: {}
+    }
+
+
+def apply_delta(state, delta):
+    """
+    updates a {section: {name: zs_data}} dict with the items of a delta
+    """
+    for section in (ZsData.LAYERS, ZsData.SPRITES):
+        for data in delta[section]:
+            state[section][data[ZsData.NAME]] = dict(data)
+
+    for name, changes in delta[CHANGED].items():
+        if name in state[ZsData.LAYERS]:
+            state[ZsData.LAYERS][name].update(changes)
+        else:
+            state[ZsData.SPRITES][name].update(changes)
+
+
+def merge_deltas(deltas):
+    """
+    combines consecutive deltas into one delta with the frame of the last
+    """
+    merged = get_delta(deltas[-1][FRAME] if deltas else 0)
+    added = {}
+
+    for delta in deltas:
+        for section in (ZsData.LAYERS, ZsData.SPRITES):
+            for data in delta[section]:
+                data = dict(data)
+                added[data[ZsData.NAME]] = data
+                merged[section].append(data)
+
+        for name, changes in delta[CHANGED].items():
+            if name in added:
+                added[name].update(changes)
+
+            elif name in merged[CHANGED]:
+                merged[CHANGED][name].update(changes)
+
+            else:
+                merged[CHANGED][name] = dict(changes)
+
+    return merged
+
+
+class DeltaRecorder:
+    """
+    Records the zs_data items each Entity logs per update as deltas in a
+      ring buffer of 'size' frames. Deltas pushed out of the buffer are
+      folded into a base state, so the state of any buffered frame can be
+      rebuilt for rewinding, and a save only needs the deltas since the
+      last one.
+    Loading a new environment starts a new recording
+    """
+    def __init__(self, context, size=Settings.DELTA_BUFFER):
+        self.context = context
+        self.deltas = deque(maxlen=size)
+        self.frame = 0
+        self.base = {}
+        self.base_frame = 0
+        self.environment = None
+
+        self.entities = []
+        self.added = []
+        self.reset()
+
+    def reset(self):
+        self.deltas.clear()
+        self.base = {
+            ZsData.LAYERS: {},
+            ZsData.SPRITES: {}
+        }
+        self.base_frame = self.frame
+        self.attach()
+
+        for entity in self.entities:
+            data = get_data(entity.zs_data)
+            self.base[get_section(entity)][entity.name] = data
+
+    def attach(self):
+        # follows the entities of the current environment without
+        #   recording the changes made while loading it
+        context = self.context
+        self.environment = context.game.environment
+        self.entities = context.get_layers() + context.get_sprites()
+        self.added = []
+
+        for entity in self.entities:
+            entity.changed_data.clear()
+
+    def add_entity(self, entity):
+        self.added.append(entity)
+
+    def record(self):
+        if self.context.game.environment is not self.environment:
+            self.reset()
+
+        self.frame += 1
+        delta = get_delta(self.frame)
+        changed = delta[CHANGED]
+
+        for entity in self.added:
+            entity.changed_data.clear()
+            delta[get_section(entity)].append(get_data(entity.zs_data))
+
+        self.entities += self.added
+        self.added = []
+
+        for entity in self.entities:
+            if entity.changed_data:
+                changed[entity.name] = get_data(
+                    entity.zs_data, entity.changed_data)
+                entity.changed_data.clear()
+
+        deltas = self.deltas
+        if len(deltas) == deltas.maxlen:
+            oldest = deltas.popleft()
+            apply_delta(self.base, oldest)
+            self.base_frame = oldest[FRAME]
+
+        deltas.append(delta)
+
+        return delta
+
+    def get_deltas(self, since=None):
+        """
+        returns the buffered deltas recorded after frame 'since'
+        """
+        if since is None:
+            return list(self.deltas)
+
+        return [d for d in self.deltas if d[FRAME] > since]
+
+    def get_state(self, frame=None):
+        """
+        returns the environment data for a buffered frame (the latest if
+          None) in the format of Context.get_json()
+        """
+        if frame is None:
+            frame = self.frame
+
+        if not self.base_frame <= frame <= self.frame:
+            raise ValueError("frame {} is not in the buffer ({} - {})".format(
+                frame, self.base_frame, self.frame))
+
+        state = {
+            section: {
+                name: dict(data) for name, data in self.base[section].items()
+            } for section in self.base
+        }
+
+        for delta in self.deltas:
+            if delta[FRAME] > frame:
+                break
+
+            apply_delta(state, delta)
+
+        return {
+            section: list(state[section].values()) for section in state
+        }
+
+    def rewind(self, frames=1):
+        """
+        reloads the environment as it was 'frames' frames ago and drops
+          the deltas recorded after that
+        """
+        frame = max(self.frame - frames, self.base_frame)
+        state = self.get_state(frame)
+
+        while self.deltas and self.deltas[-1][FRAME] > frame:
+            self.deltas.pop()
+        self.frame = frame
+
+        self.context.load_environment(state)
+        self.attach()
+
+    def save(self, file_name, since=None):
+        """
+        saves the base state and every buffered delta as a binary
+          snapshot, or only the deltas after frame 'since' for an
+          incremental save
+        """
+        data = {
+            FRAME: self.frame,
+            DELTAS: self.get_deltas(since)
+        }
+
+        if since is None:
+            data[BASE_FRAME] = self.base_frame
+            data[BASE] = {
+                section: list(self.base[section].values())
+                for section in self.base
+            }
+
+        save_snapshot(data, file_name)
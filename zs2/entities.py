@@ -1,11 +1,36 @@
-from zs_constants import ZsData, Settings
+from zs_constants import ZsData, Settings, ApiConstants
 from zs2.controller_io import ControllerIO
 from zs2.events import EventHandlerInterface
 from zs2.collections import Group
 from zs2.geometry import add_points
 
 
+def get_data_value(v):
+    # Entities and Groups are logged by name
+    if type(v) is list:
+        return [get_data_value(item) for item in v]
+
+    else:
+        if isinstance(v, (Entity, Group)):
+            return v.name
+        else:
+            return v
+
+
 class EntityMetaclass(type):
+    # Each class gets the names of its attributes with a 'set_' method
+    #   as TRACKED_ATTRS, and WATCHED_ATTRS, every attribute name that
+    #   Entity.__setattr__ has to act on. Setters added to a class after
+    #   it's created aren't tracked
+    def __init__(cls, name, bases, namespace):
+        super(EntityMetaclass, cls).__init__(name, bases, namespace)
+        n = len(ApiConstants.SET_)
+
+        cls.TRACKED_ATTRS = frozenset(
+            attr[n:] for attr in dir(cls) if attr.startswith(ApiConstants.SET_)
+        )
+        cls.WATCHED_ATTRS = cls.TRACKED_ATTRS | cls.RENDER_ATTRS
+
     def __call__(cls, *args, **kwargs):
         new = type.__call__(cls, *args, **kwargs)
         new.initialized = True
@@ -14,6 +39,9 @@ class EntityMetaclass(type):
 
 
 class Entity(EventHandlerInterface, metaclass=EntityMetaclass):
+    # assigning any of these attributes marks cached draw commands as dirty
+    RENDER_ATTRS = frozenset(("position", "visible", "graphics"))
+
     def __init__(self, name):
         super(Entity, self).__init__(name)
 
@@ -25,6 +53,8 @@ class Entity(EventHandlerInterface, metaclass=EntityMetaclass):
             ZsData.NAME: self.name,
             ZsData.CLASS: self.__class__.__name__
         }
+        # zs_data keys logged since the last DeltaRecorder.record()
+        self.changed_data = set()
 
         self.size = 0, 0
         self.position = 0, 0
@@ -50,9 +80,18 @@ class Entity(EventHandlerInterface, metaclass=EntityMetaclass):
     # Once initialized, changes to any attribute with
     #   a corresponding setter method are tracked
     def __setattr__(self, key, value):
-        super(Entity, self).__setattr__(key, value)
+        object.__setattr__(self, key, value)
+
+        # most assignments are to untracked attributes
+        if key not in self.WATCHED_ATTRS:
+            return
 
-        if hasattr(self, "set_" + key) and self.initialized:
+        if key in Entity.RENDER_ATTRS:
+            graphics = self.__dict__.get("graphics")
+            if graphics:
+                graphics.dirty = True
+
+        if key in self.TRACKED_ATTRS and self.initialized:
             if not (key == ZsData.PARENT_LAYER and value == ZsData.ENVIRONMENT):
                 self.log_data(key, value)
 
@@ -60,18 +99,9 @@ class Entity(EventHandlerInterface, metaclass=EntityMetaclass):
         return self.zs_data
 
     def log_data(self, key, value):
-        def get_value(v):
-            if type(v) is list:
-                return [get_value(item) for item in v]
-
-            else:
-                if isinstance(v, (Entity, Group)):
-                    return v.name
-                else:
-                    return v
-
-        value = get_value(value)
+        value = get_data_value(value)
         self.zs_data[key] = value
+        self.changed_data.add(key)
         # print("Updated {}\n\t{}: {}".format(self, key, value))
 
     def add_to_list(self, list_name, *items):
@@ -122,6 +152,10 @@ class Layer(Entity):
         self.controllers = []
         self.parent_layer = None
 
+        # retained render list, see get_graphics()
+        self.render_parts = []
+        self.render_list = []
+
         self.update_methods += [
             self.update_sprites,
             self.update_sub_layers,
@@ -141,26 +175,49 @@ class Layer(Entity):
 
         self.add_to_list(ZsData.GROUPS, *add)
 
+    # The flattened draw command list is kept between frames and only
+    #   rebuilt when one of the cached child lists it was built from
+    #   changes, so static scenes return the same list every frame
     def get_graphics(self, position=None):
         if not position:
             position = self.position
 
-        args = []
+        if not self.visible:
+            if self.render_parts:
+                self.render_parts = []
+                self.render_list = []
+
+            return self.render_list
+
+        parts = list(self.get_render_parts(position))
+        old = self.render_parts
+
+        changed = len(parts) != len(old)
+        if not changed:
+            for part, old_part in zip(parts, old):
+                if part is not old_part:
+                    changed = True
+                    break
 
-        if self.visible:
-            if self.graphics:
-                args += self.graphics.get_graphics(position)
+        if changed:
+            self.render_parts = parts
+            self.render_list = [args for part in parts for args in part]
 
-            for l in self.sub_layers:
-                args += l.get_graphics(
-                    add_points(position, l.position)
-                )
+        return self.render_list
 
-            for sprite in self.get_sprites():
-                if sprite.graphics and sprite.visible:
-                    args += sprite.graphics.get_graphics(position)
+    def get_render_parts(self, position):
+        if self.graphics:
+            yield self.graphics.get_render_list(position)
 
-        return args
+        for l in self.sub_layers:
+            yield l.get_graphics(
+                add_points(position, l.position)
+            )
+
+        for g in self.groups:
+            for sprite in g:
+                if isinstance(sprite, Sprite) and sprite.graphics and sprite.visible:
+                    yield sprite.graphics.get_render_list(position)
 
     def get_sprites(self):
         sprites = []
@@ -2,32 +2,77 @@ from sys import exit
 
 
 class Game:
-    def __init__(self, screen=None, clock=None, frame_rate=1):
+    # update_rate sets a fixed simulation rate in Hz, decoupled from
+    #   frame_rate. If None the environment updates once per frame
+    def __init__(self, screen=None, clock=None, frame_rate=1,
+                 update_rate=None, max_steps=5):
         self.environment = None
         self.context = None
         self.clock = clock
         self.screen = screen
         self.frame_rate = frame_rate
 
+        self.update_rate = update_rate
+        self.max_steps = max_steps
+        self.accumulator = 0
+        self.alpha = 0
+
     def update_game(self):
         self.update_environment()
         self.draw_environment()
 
     def update_environment(self):
         self.environment.update()
+        context = self.context
+
+        if context:
+            if context.recorder:
+                context.recorder.record()
+
+            if context.queued_environment:
+                context.load_queued_environment()
 
     def draw_environment(self):
         if self.screen:
             self.screen.draw(self.environment)
 
+    # runs as many fixed steps as the elapsed time allows (at most
+    #   max_steps) then draws once. alpha is the fraction of a step
+    #   left in the accumulator, for interpolating graphics
+    def update_fixed_step(self, dt):
+        step = 1 / self.update_rate
+        self.accumulator += dt
+        steps = 0
+
+        while self.accumulator >= step and steps < self.max_steps:
+            self.context.model["dt"] = step
+            self.update_environment()
+            self.accumulator -= step
+            steps += 1
+
+        # drop any backlog left after a load spike
+        if steps == self.max_steps:
+            self.accumulator %= step
+
+        self.alpha = self.accumulator / step
+        self.context.model["alpha"] = self.alpha
+        self.draw_environment()
+
     def main(self):
         while True:
+            dt = None
             if self.clock:
                 dt = self.clock.tick(self.frame_rate) / 1000
                 self.context.model["dt"] = dt
                 # print(dt)
 
-            self.update_game()
+            if self.update_rate:
+                if dt is None:
+                    dt = 1 / self.update_rate
+                self.update_fixed_step(dt)
+
+            else:
+                self.update_game()
 
     @staticmethod
     def quit():
@@ -1,18 +1,43 @@
 from pygame import transform, Surface, SRCALPHA
 
-from zs_constants import Settings
+from zs_constants import Settings, Resources as Res
 from zs2.geometry import Rect, Vector
 from zs2.meters import Meter
-from zs2.resources import load_resource, Image
+from zs2.resources import load_resource, Image, AssetCache, BAKED_STEPS, get_cache_key, load_cached_surface, save_cached_surface
 
 
 class Graphics:
+    # assigning any of these attributes marks the cached
+    #   draw commands as dirty
+    RENDER_ATTRS = frozenset(("image", "mirror", "layers", "items", "frame"))
+    retained = True
+
     def __init__(self, entity):
         self.entity = entity
 
+        self.dirty = True
+        self.render_position = None
+        self.render_list = []
+
+    def __setattr__(self, key, value):
+        super(Graphics, self).__setattr__(key, value)
+
+        if key in Graphics.RENDER_ATTRS:
+            super(Graphics, self).__setattr__("dirty", True)
+
     def get_graphics(self, position):
         pass
 
+    # returns the cached draw commands, only calling get_graphics
+    #   when something has changed since the last frame
+    def get_render_list(self, position):
+        if self.dirty or not self.retained or position != self.render_position:
+            self.render_list = self.get_graphics(position)
+            self.render_position = position
+            self.dirty = False
+
+        return self.render_list
+
 
 class ImageGraphics(Graphics):
     def __init__(self, entity, image):
@@ -147,7 +172,7 @@ class TextGraphics(ImageGraphics):
             y = line_height * i
             sprite_image.blit(image, (0, y))
 
-        return Image(sprite_image)
+        return Image(sprite_image).convert()
 
     def reset_image(self):
         self.image = self.make_text_image(
@@ -186,7 +211,6 @@ class LayeredImageGraphics(ImageGraphics):
     # rotate = float
     def get_args_from_layer(self, layer):
         rect, offset = layer[0:2]
-        image = self.image.subsurface(rect)
 
         mirror = False, False
         rotate = 0
@@ -196,9 +220,7 @@ class LayeredImageGraphics(ImageGraphics):
             if len(layer) > 3:
                 rotate = layer[3]
 
-        mirror_x, mirror_y = mirror
-        if mirror_x or mirror_y:
-            image = image.flip(mirror_x, mirror_y)
+        image = self.image.get_region(rect, mirror)
 
         # if rotate:
         #   image = image.get_rotated(rotate)
@@ -258,6 +280,76 @@ class AnimationGraphics(LayeredImageGraphics):
 
         self.animation_cycles = 0
 
+        # {AnimationStep: (Image, offset)}, see bake_animations()
+        #   the Images are shared through BAKED_STEPS
+        self.baked_steps = {}
+        self.frame = None
+
+    def get_graphics(self, position):
+        if not self.frame:
+            return super(AnimationGraphics, self).get_graphics(position)
+
+        else:
+            image, (ox, oy) = self.frame
+            px, py = position
+            ex, ey = self.entity.position
+
+            return [(image, (ex + ox + px, ey + oy + py))]
+
+    # composites the layers of every step into a single image so
+    #   each animated entity costs one blit per frame
+    def bake_animations(self):
+        for animation in self.animations.values():
+            for step in animation.steps:
+                if step not in self.baked_steps:
+                    baked = self.bake_step(step)
+
+                    if baked:
+                        self.baked_steps[step] = baked
+
+        self.update_image_layers()
+
+    def bake_step(self, step):
+        layers = step.layers
+        if not layers:
+            return None
+
+        left = min(l.offset[0] for l in layers)
+        top = min(l.offset[1] for l in layers)
+        right = max(l.offset[0] + l.size[0] for l in layers)
+        bottom = max(l.offset[1] + l.size[1] for l in layers)
+
+        # every entity animated with the same sheet bakes a step once
+        data = tuple(
+            (tuple(l.size), tuple(l.position), tuple(l.offset), tuple(l.mirror))
+            for l in layers
+        )
+        baked = BAKED_STEPS.get((self.image, data))
+
+        if not baked:
+            key = None
+            if Res.DISK_CACHE:
+                key = get_cache_key("animation_step", self.image, data)
+            surface = None
+            if key:
+                surface = load_cached_surface(key)
+
+            if not surface:
+                surface = Surface((right - left, bottom - top), SRCALPHA, 32)
+
+                for l in layers:
+                    image = self.image.get_region(Rect(l.size, l.position), l.mirror)
+                    ox, oy = l.offset
+                    surface.blit(image.pygame_surface, (ox - left, oy - top))
+
+                if key:
+                    save_cached_surface(key, surface)
+
+            baked = Image(surface).convert()
+            BAKED_STEPS.add((self.image, data), baked)
+
+        return baked, (left, top)
+
     def update(self):
         meter = self.animation_meter
         if meter.is_full():
@@ -268,12 +360,23 @@ class AnimationGraphics(LayeredImageGraphics):
 
     def update_image_layers(self):
         state = self.entity.get_animation_state()
-        self.layers = []
 
         if state in self.animations:
             animation = self.animations[state]
             step = animation.get_current_step(self.animation_meter.value)
 
+            if step in self.baked_steps:
+                frame = self.baked_steps[step]
+                if frame is not self.frame:
+                    self.frame = frame
+
+                return
+
+        if self.frame:
+            self.frame = None
+        self.layers = []
+
+        if state in self.animations:
             for layer in step.layers:
                 rect = Rect(layer.size, layer.position)
                 offset = layer.offset
@@ -294,14 +397,38 @@ class AnimationGraphics(LayeredImageGraphics):
 
 
 class ContainerGraphics(ImageGraphics):
-    PRE_RENDERS = {}
+    PRE_RENDERS = AssetCache("pre_renders", budget=Res.PRE_RENDER_CACHE_BYTES)
 
     def __init__(self, entity):
         image = self.get_rect_image(entity.size, entity.style)
         super(ContainerGraphics, self).__init__(entity, image)
 
+    @staticmethod
+    def get_cache_key(size, style):
+        # hashing the source files is only worth it for the disk cache
+        if not Res.DISK_CACHE:
+            return None
+
+        names = [style.bg_image]
+        if style.border:
+            names += style.border_images
+
+        images = [load_resource(n) for n in names if n]
+
+        return get_cache_key(
+            "container", list(size), style.get_copy(),
+            Settings.SCREEN_SIZE, *images
+        )
+
     @staticmethod
     def get_rect_image(size, style):
+        key = ContainerGraphics.get_cache_key(size, style)
+        if key:
+            surface = load_cached_surface(key)
+
+            if surface:
+                return Image(surface).convert()
+
         bg_color = style.bg_color
         if not bg_color:
             bg_color = 0, 0, 0
@@ -330,7 +457,10 @@ class ContainerGraphics(ImageGraphics):
                 image, style.alpha_color
             )
 
-        return Image(image)
+        if key:
+            save_cached_surface(key, image)
+
+        return Image(image).convert()
 
     def reset_image(self):
         self.image = self.get_rect_image(
@@ -341,7 +471,9 @@ class ContainerGraphics(ImageGraphics):
     def tile(image_name, surface):
         # PYGAME CHOKE POINT
 
-        if image_name not in ContainerGraphics.PRE_RENDERS:
+        full_bg = ContainerGraphics.PRE_RENDERS.get(image_name)
+
+        if not full_bg:
             bg_image = load_resource(image_name)
             sx, sy = Settings.SCREEN_SIZE  # pre render the tiled background
             sx *= 2  # to the size of a full screen
@@ -356,10 +488,10 @@ class ContainerGraphics(ImageGraphics):
                 for y in range(0, h + img_h, img_h):
                     pr_surface.blit(bg_image.pygame_surface, (x, y))
 
-            ContainerGraphics.PRE_RENDERS[image_name] = pr_surface
+            ContainerGraphics.PRE_RENDERS.add(image_name, pr_surface)
+            full_bg = pr_surface
 
-        full_bg = ContainerGraphics.PRE_RENDERS[image_name]     # return a subsection of the full
-        #                                                       # pre rendered background
+        # return a subsection of the full pre rendered background
         r = surface.get_rect().clip(full_bg.get_rect())
         blit_region = full_bg.subsurface(r)
         surface.blit(blit_region, (0, 0))
@@ -425,7 +557,9 @@ class ContainerGraphics(ImageGraphics):
 
     @staticmethod
     def get_full_side_image(image_name, orientation):
-        if image_name not in ContainerGraphics.PRE_RENDERS:
+        pr_surface = ContainerGraphics.PRE_RENDERS.get(image_name)
+
+        if not pr_surface:
             image = load_resource(image_name)
             iw, ih = image.get_size()
 
@@ -443,9 +577,9 @@ class ContainerGraphics(ImageGraphics):
                             v: (i, 0)}[orientation]
                 pr_surface.blit(image.pygame_surface, position)
 
-            ContainerGraphics.PRE_RENDERS[image_name] = pr_surface
+            ContainerGraphics.PRE_RENDERS.add(image_name, pr_surface)
 
-        return ContainerGraphics.PRE_RENDERS[image_name]
+        return pr_surface
 
     @staticmethod
     def draw_corners(image_name, surface, corners):
@@ -477,6 +611,9 @@ class ContainerGraphics(ImageGraphics):
 
 
 class GeometryGraphics(Graphics):
+    # items are mutable Rect / Vector objects so they can't be cached
+    retained = False
+
     def __init__(self, entity):
         super(GeometryGraphics, self).__init__(entity)
 
@@ -1,3 +1,5 @@
+import numpy as np
+
 from zs2.geometry import Vector
 
 
@@ -17,10 +19,16 @@ class Physics:
         self.forces = []
         self.last_position = 0, 0
 
+        # set by PhysicsWorld.add_body()
+        self.world = None
+        self.index = None
+
     def get_instantaneous_velocity(self):
         entity = self.entity
         x, y = entity.position
         lx, ly = self.last_position
+        if self.world:
+            lx, ly = self.world.last_positions[self.index]
 
         x -= lx
         y -= ly
@@ -29,23 +37,35 @@ class Physics:
 
     def set_mass(self, value):
         self.mass = value
+        if self.world:
+            self.world.masses[self.index] = value
 
     def set_elasticity(self, value):
         self.elasticity = value
 
     def set_gravity(self, value):
         self.gravity = value
+        if self.world:
+            self.world.gravities[self.index] = value
 
     def set_friction(self, value):
         self.friction = value
+        if self.world:
+            self.world.frictions[self.index] = value
 
     def scale_movement_in_direction(self, angle, value):
         self.velocity.scale_in_direction(angle, value)
 
     def apply_force(self, i, j):
-        self.forces.append(
-            Vector(i, j)
-        )
+        if self.world:
+            force = self.world.forces[self.index]
+            force[0] += i
+            force[1] += j
+
+        else:
+            self.forces.append(
+                Vector(i, j)
+            )
 
     def integrate_forces(self):
         forces = self.forces
@@ -82,49 +102,465 @@ class Physics:
         self.apply_velocity()
 
 
+class ArrayVector(Vector):
+    # Vector whose values are stored in a row of a PhysicsWorld
+    #   velocity array, so Vector methods like scale_in_direction()
+    #   still work on bodies integrated by the world
+    def __init__(self, world, body):
+        self.world = world
+        self.body = body
+        self.color = None
+
+    @property
+    def i_hat(self):
+        return float(self.world.velocities[self.body.index, 0])
+
+    @i_hat.setter
+    def i_hat(self, value):
+        self.world.velocities[self.body.index, 0] = value
+
+    @property
+    def j_hat(self):
+        return float(self.world.velocities[self.body.index, 1])
+
+    @j_hat.setter
+    def j_hat(self, value):
+        self.world.velocities[self.body.index, 1] = value
+
+
+class PhysicsWorld:
+    # Integrates many Physics components in one vectorized step.
+    #   Body state lives in contiguous arrays indexed by Physics.index,
+    #   and PhysicsWorld.update should be added to a single update_methods
+    #   list (e.g. the environment layer) in place of each body's update
+    def __init__(self, capacity=64):
+        self.bodies = []
+
+        self.masses = np.zeros(capacity)
+        self.gravities = np.zeros(capacity)
+        self.frictions = np.zeros(capacity)
+        self.velocities = np.zeros((capacity, 2))
+        self.forces = np.zeros((capacity, 2))
+        self.positions = np.zeros((capacity, 2))
+        self.last_positions = np.zeros((capacity, 2))
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def set_capacity(self, capacity):
+        for name in ("masses", "gravities", "frictions", "velocities",
+                     "forces", "positions", "last_positions"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:])
+            new[:len(old)] = old[:capacity]
+            setattr(self, name, new)
+
+    def add_body(self, body):
+        i = len(self.bodies)
+        if i == len(self.masses):
+            self.set_capacity(max(1, i * 2))
+
+        self.masses[i] = body.mass
+        self.gravities[i] = body.gravity
+        self.frictions[i] = body.friction
+        self.velocities[i] = body.velocity.get_value()
+        self.positions[i] = body.entity.position
+        self.last_positions[i] = body.last_position
+
+        fi, fj = 0, 0
+        for f in body.forces:
+            fi += f.i_hat
+            fj += f.j_hat
+        self.forces[i] = fi, fj
+
+        self.bodies.append(body)
+        body.world = self
+        body.index = i
+        body.forces = []
+        body.velocity = ArrayVector(self, body)
+
+        if body.update in body.entity.update_methods:
+            body.entity.update_methods.remove(body.update)
+
+    def remove_body(self, body):
+        i = body.index
+        last = len(self.bodies) - 1
+
+        velocity = Vector(*body.velocity.get_value())
+        body.last_position = tuple(self.last_positions[i].tolist())
+        fi, fj = self.forces[i].tolist()
+        if fi or fj:
+            body.forces = [Vector(fi, fj)]
+
+        # move the last body into the freed row
+        if i != last:
+            moved = self.bodies[last]
+            self.bodies[i] = moved
+            moved.index = i
+
+            for a in (self.masses, self.gravities, self.frictions,
+                      self.velocities, self.forces, self.positions,
+                      self.last_positions):
+                a[i] = a[last]
+
+        self.bodies.pop()
+        self.forces[last] = 0
+
+        body.world = None
+        body.index = None
+        body.velocity = velocity
+        body.entity.update_methods.append(body.update)
+
+    def update(self):
+        n = len(self.bodies)
+        if not n:
+            return
+
+        bodies = self.bodies
+        masses = self.masses[:n]
+        velocities = self.velocities[:n]
+        forces = self.forces[:n]
+        positions = self.positions[:n]
+
+        # entities may have been moved by other update methods
+        positions[:] = [b.entity.position for b in bodies]
+        self.last_positions[:n] = positions
+
+        # integrate forces, friction
+        velocities += forces
+        velocities *= self.frictions[:n, None]
+
+        # gravity is applied as a force on the next step
+        forces[:] = 0
+        forces[:, 1] = self.gravities[:n] * masses
+
+        # movement
+        movement = np.zeros((n, 2))
+        np.divide(velocities, masses[:, None], out=movement,
+                  where=masses[:, None] != 0)
+        positions += movement
+
+        # write back only bodies that moved
+        for i in np.flatnonzero(movement.any(axis=1)).tolist():
+            x, y = positions[i].tolist()
+            bodies[i].entity.set_position(x, y)
+
+
+# pair filters for CollisionSystem, return False to skip a pair
+def check_layer_masks(a, b):
+    layer_a = getattr(a, "collision_layer", 1)
+    layer_b = getattr(b, "collision_layer", 1)
+    mask_a = getattr(a, "collision_mask", ~0)
+    mask_b = getattr(b, "collision_mask", ~0)
+
+    return bool(layer_a & mask_b) and bool(layer_b & mask_a)
+
+
+def check_different_owner(a, b):
+    owner_a = getattr(a, "owner", None)
+    owner_b = getattr(b, "owner", None)
+
+    if owner_a is b or owner_b is a:
+        return False
+
+    return owner_a is None or owner_a is not owner_b
+
+
+def check_awake(a, b):
+    return not (getattr(a, "sleeping", False) and getattr(b, "sleeping", False))
+
+
 class CollisionSystem:
-    def __init__(self, a, b, test, handle):
+    # a handle_method can return STOP to end the current update early
+    STOP = object()
+
+    def __init__(self, a, b, test, handle, broad_phase=None, filters=None):
         self.group_a = a
         self.group_b = b
 
         self.test_method = test
         self.handle_method = handle
 
+        if not broad_phase:
+            broad_phase = BroadPhase()
+        self.broad_phase = broad_phase
+
+        if not filters:
+            filters = []
+        self.filters = list(filters)
+
+    def add_filter(self, f):
+        self.filters.append(f)
+
     def update(self):
         for (a, b) in self.get_pairs():
             collision = self.test_method(a, b)
 
             if collision:
-                self.handle_method(a, b, collision)
+                result = self.handle_method(a, b, collision)
+
+                if result is CollisionSystem.STOP:
+                    break
 
     def get_pairs(self):
-        a, b = self.group_a, self.group_b
+        pairs = self.broad_phase.get_pairs(
+            self.group_a, self.group_b
+        )
 
-        if b is None:
-            return self.get_single_permutation(a)
+        for f in self.filters:
+            pairs = self.filter_pairs(pairs, f)
+
+        return pairs
+
+    @staticmethod
+    def filter_pairs(pairs, f):
+        for a, b in pairs:
+            if f(a, b):
+                yield a, b
+
+
+class BroadPhase:
+    # Reference broad-phase that yields every possible pair
+    #   for the narrow-phase test_method. Pairs are generated
+    #   lazily so no per-frame pair list is allocated, but from
+    #   a copy of each group, since handle methods may remove
+    #   entities from the groups being iterated
+    def get_pairs(self, group_a, group_b=None):
+        if group_b is None:
+            return self.get_single_permutation(group_a)
 
         else:
-            return self.get_double_permutation(a, b)
+            return self.get_double_permutation(group_a, group_b)
 
     @staticmethod
     def get_single_permutation(group):
-        pairs = []
-        tested = []
-
-        for item in group:
-            tested.append(item)
+        items = list(group)
+        n = len(items)
 
-            for other in [o for o in group if o not in tested]:
-                pairs.append((item, other))
+        for i in range(n):
+            item = items[i]
 
-        return pairs
+            for j in range(i + 1, n):
+                yield item, items[j]
 
     @staticmethod
     def get_double_permutation(group_a, group_b):
-        pairs = []
+        items_b = list(group_b)
 
-        for item in group_a:
-            for other in group_b:
-                pairs.append((item, other))
+        for item in list(group_a):
+            for other in items_b:
+                yield item, other
 
-        return pairs
+    @staticmethod
+    def get_bounds(entity):
+        x, y = entity.position
+        w, h = entity.size
+
+        return x, y, x + w, y + h
+
+
+class SpatialHash(BroadPhase):
+    # Uniform grid keyed by entity position / size. Only entities
+    #   that share at least one cell are yielded as pairs
+    # A grid is kept for the last group passed in each position, and
+    #   rebuilt when a different group object is passed, so each
+    #   CollisionSystem should have its own SpatialHash
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.grids = [None, None]
+
+    def get_cell_keys(self, entity):
+        cs = self.cell_size
+        left, top, right, bottom = self.get_bounds(entity)
+
+        return (
+            int(left // cs), int(top // cs),
+            int(right // cs), int(bottom // cs)
+        )
+
+    def update_grid(self, group, slot=0):
+        # cells: {(col, row): [entity, ...]}
+        # keys: {entity: (left, top, right, bottom) cell range}
+        grid = self.grids[slot]
+        if grid is None or grid[0] is not group:
+            grid = group, {}, {}
+            self.grids[slot] = grid
+
+        group, cells, keys = grid
+        members = set(group)
+
+        for entity in [e for e in keys if e not in members]:
+            self.remove_entity(cells, entity, keys.pop(entity))
+
+        for entity in group:
+            new = self.get_cell_keys(entity)
+            old = keys.get(entity)
+
+            if new != old:
+                if old:
+                    self.remove_entity(cells, entity, old)
+                self.add_entity(cells, entity, new)
+                keys[entity] = new
+
+        return cells, keys
+
+    @staticmethod
+    def get_cells(cell_range):
+        left, top, right, bottom = cell_range
+
+        for col in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                yield col, row
+
+    def add_entity(self, cells, entity, cell_range):
+        for key in self.get_cells(cell_range):
+            if key not in cells:
+                cells[key] = []
+            cells[key].append(entity)
+
+    def remove_entity(self, cells, entity, cell_range):
+        for key in self.get_cells(cell_range):
+            cell = cells[key]
+            cell.remove(entity)
+
+            if not cell:
+                cells.pop(key)
+
+    # entities sharing several cells are only yielded from the
+    #   top left cell of their overlap, so no 'tested' set is needed
+    @staticmethod
+    def is_first_cell(key, range_a, range_b):
+        return key == (
+            max(range_a[0], range_b[0]),
+            max(range_a[1], range_b[1])
+        )
+
+    def get_single_permutation(self, group):
+        cells, keys = self.update_grid(group)
+        is_first_cell = self.is_first_cell
+
+        for key, cell in list(cells.items()):
+            n = len(cell)
+
+            for i in range(n):
+                item = cell[i]
+
+                for j in range(i + 1, n):
+                    other = cell[j]
+
+                    if is_first_cell(key, keys[item], keys[other]):
+                        yield item, other
+
+    def get_double_permutation(self, group_a, group_b):
+        cells, keys_b = self.update_grid(group_b)
+        keys_a = self.update_grid(group_a, 1)[1]
+        is_first_cell = self.is_first_cell
+
+        for item in list(group_a):
+            range_a = keys_a[item]
+
+            for key in self.get_cells(range_a):
+                for other in cells.get(key, ()):
+                    if is_first_cell(key, range_a, keys_b[other]):
+                        yield item, other
+
+
+class SweepAndPrune(BroadPhase):
+    # Keeps the endpoints on the sweep axis sorted across frames. Since
+    #   entities move little between frames the list stays nearly sorted
+    #   and an insertion sort restores order in close to linear time.
+    #   The other axis is only checked for pairs that overlap on the
+    #   sweep axis, against each entity's current bounds
+    # endpoint = [value, is_end, entity]
+    # entities = {entity: [start point, end point, bounds]}
+    def __init__(self, axis=0):
+        self.axis = axis
+        self.endpoints = []
+        self.entities = {}
+
+    def update_endpoints(self, *groups):
+        members = {}
+        for g in groups:
+            for entity in g:
+                members[entity] = True
+
+        stale = [e for e in self.entities if e not in members]
+        if stale:
+            self.entities = {
+                e: self.entities[e] for e in self.entities if e in members
+            }
+            self.endpoints = [p for p in self.endpoints if p[2] in members]
+
+        axis = self.axis
+        for entity in members:
+            bounds = self.get_bounds(entity)
+            points = self.entities.get(entity)
+
+            if not points:
+                start = [bounds[axis], False, entity]
+                end = [bounds[axis + 2], True, entity]
+                self.endpoints.extend((start, end))
+                self.entities[entity] = [start, end, bounds]
+
+            else:
+                points[0][0], points[1][0] = bounds[axis], bounds[axis + 2]
+                points[2] = bounds
+
+        self.insertion_sort(self.endpoints)
+
+    # start points sort before end points with the same value so
+    #   that touching intervals are reported as overlapping
+    @staticmethod
+    def insertion_sort(points):
+        for i in range(1, len(points)):
+            point = points[i]
+            key = point[0], point[1]
+            j = i - 1
+
+            while j >= 0 and (points[j][0], points[j][1]) > key:
+                points[j + 1] = points[j]
+                j -= 1
+
+            points[j + 1] = point
+
+    def get_overlaps(self):
+        # yields every pair of entities whose intervals overlap on
+        #   both axes, using the sweep axis endpoint list
+        other = 1 - self.axis
+        entities = self.entities
+        active = []
+
+        for value, is_end, entity in self.endpoints:
+            if is_end:
+                active.remove(entity)
+
+            else:
+                bounds = entities[entity][2]
+                start, end = bounds[other], bounds[other + 2]
+                for item in active:
+                    i_bounds = entities[item][2]
+
+                    if start <= i_bounds[other + 2] and i_bounds[other] <= end:
+                        yield item, entity
+
+                active.append(entity)
+
+    def get_single_permutation(self, group):
+        self.update_endpoints(group)
+
+        return self.get_overlaps()
+
+    def get_double_permutation(self, group_a, group_b):
+        self.update_endpoints(group_a, group_b)
+        in_a = set(group_a)
+        in_b = set(group_b)
+
+        for item in in_a & in_b:
+            yield item, item
+
+        for p, q in self.get_overlaps():
+            if p in in_a and q in in_b:
+                yield p, q
+
+            if q in in_a and p in in_b:
+                yield q, p
@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import pygame                           # PYGAME CHOKE POINT
+
+from zs_constants import Settings, Resources as Res
+from zs2.resources import load_resource, get_path, add_image, IMAGES, LOADED_IMAGES
+from zs2.style import Style
+
+FONT_KEYS = "font_name", "font_size", "bold", "italic"
+
+
+class PreloadJob:
+    """
+    Tracks the loading tasks started for one file. Each task submits
+      the tasks for the files it references before it finishes, so once
+      every submitted task is done there is nothing left to load
+    The worker threads only read files: JSON is parsed and image files
+      are loaded, but converting images and creating fonts call SDL in
+      ways that aren't thread safe, so finish() does that on the main
+      thread
+    """
+    def __init__(self, pool, file_name):
+        self.pool = pool
+        self.file_name = file_name
+        self.futures = []
+        self.submitted = set()
+        self.lock = Lock()
+
+        self.images = []        # (path, Surface) for finish()
+        self.fonts = []         # font styles for finish()
+
+    def __repr__(self):
+        return "PreloadJob: {} ({} tasks)".format(
+            self.file_name, len(self.futures))
+
+    def submit(self, method, key, *args):
+        with self.lock:
+            if key in self.submitted:
+                return
+
+            self.submitted.add(key)
+            self.futures.append(
+                self.pool.submit(method, *args)
+            )
+
+    def done(self):
+        with self.lock:
+            futures = list(self.futures)
+
+        return all(f.done() for f in futures)
+
+    def wait(self):
+        # re-raises the first exception from a loading task
+        while not self.done():
+            with self.lock:
+                futures = list(self.futures)
+
+            for f in futures:
+                f.result()
+
+        for f in self.futures:
+            f.result()
+
+    def finish(self):
+        """
+        waits for the workers, then converts the loaded images and
+          creates the fonts on the calling (main) thread
+        """
+        self.wait()
+
+        for path, surface in self.images:
+            if path not in LOADED_IMAGES:
+                add_image(path, surface)
+
+        for data in self.fonts:
+            Style(data).get_font()
+
+        self.images = []
+        self.fonts = []
+
+    def load_file(self, file_name):
+        # not every string that looks like a file name is one,
+        #   missing resources are reported when they're really loaded
+        ext = file_name.split(".")[-1]
+
+        try:
+            if ext in Res.IMAGE_EXT:
+                self.load_image(get_path(IMAGES, file_name))
+
+            else:
+                self.load_data(load_resource(file_name))
+
+        except FileNotFoundError:
+            return
+
+    def load_image(self, path):
+        if path not in LOADED_IMAGES:
+            surface = pygame.image.load(path)
+
+            with self.lock:
+                self.images.append((path, surface))
+
+    def add_font(self, key, data):
+        with self.lock:
+            if key in self.submitted:
+                return
+
+            self.submitted.add(key)
+            self.fonts.append(data)
+
+    def load_data(self, data):
+        # walks parsed JSON for resource file names and font styles
+        if type(data) is dict:
+            if any(k in data for k in FONT_KEYS):
+                key = tuple(str(data.get(k)) for k in FONT_KEYS)
+                self.add_font(key, data)
+
+            for key in data:
+                self.load_data(key)
+                self.load_data(data[key])
+
+        elif type(data) is list:
+            for item in data:
+                self.load_data(item)
+
+        elif type(data) is str:
+            # only 'name.ext' strings, not bare words like "json"
+            name, dot, ext = data.rpartition(".")
+
+            if name and (ext == Res.JSON or ext in Res.IMAGE_EXT):
+                self.submit(self.load_file, data, data)
+
+
+class Preloader:
+    """
+    Warms the JSON and image caches used by Context.load_environment on
+      a pool of worker threads, see PreloadJob
+    """
+    def __init__(self, workers=Settings.PRELOAD_WORKERS):
+        self.pool = ThreadPoolExecutor(workers)
+
+    def preload(self, file_name):
+        job = PreloadJob(self.pool, file_name)
+        job.submit(job.load_file, file_name, file_name)
+
+        return job
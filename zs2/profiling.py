@@ -0,0 +1,133 @@
+from collections import deque
+from time import perf_counter
+
+from zs_constants import Settings
+from zs2.entities import Entity
+from zs2.game import Game
+from zs2.zson import save_json
+
+
+def get_method_name(method):
+    return getattr(method, "__qualname__", repr(method))
+
+
+class Profiler:
+    """
+    Opt-in timing hooks for the main loop. enable() swaps Game and Entity
+      methods for timed versions and disable() restores the originals, so
+      a disabled Profiler adds no overhead at all.
+    Every call is counted, but times are kept for the last 'window' calls
+      of each key:
+      'Game.update_environment', 'Game.draw_environment' and
+      '<Entity class>: <update method>' for each of Entity.update_methods
+    """
+    PATCHED = (
+        (Game, "update_environment"),
+        (Game, "draw_environment"),
+        (Entity, "update")
+    )
+
+    def __init__(self, window=Settings.PROFILE_WINDOW):
+        self.window = window
+        self.times = {}
+        self.counts = {}
+        self.originals = {}
+
+    @property
+    def enabled(self):
+        return bool(self.originals)
+
+    def record(self, key, t):
+        if key not in self.times:
+            self.times[key] = deque(maxlen=self.window)
+            self.counts[key] = 0
+
+        self.times[key].append(t)
+        self.counts[key] += 1
+
+    def reset(self):
+        self.times = {}
+        self.counts = {}
+
+    def enable(self):
+        if self.enabled:
+            return
+
+        for cls, name in self.PATCHED:
+            method = cls.__dict__[name]
+            self.originals[(cls, name)] = method
+
+            if cls is Entity:
+                timed = self.get_timed_update()
+            else:
+                timed = self.get_timed_method(
+                    method, "{}.{}".format(cls.__name__, name)
+                )
+
+            setattr(cls, name, timed)
+
+    def disable(self):
+        for (cls, name), method in self.originals.items():
+            setattr(cls, name, method)
+
+        self.originals = {}
+
+    def get_timed_method(self, method, key):
+        record = self.record
+
+        def timed_method(*args, **kwargs):
+            start = perf_counter()
+            value = method(*args, **kwargs)
+            record(key, perf_counter() - start)
+
+            return value
+
+        return timed_method
+
+    def get_timed_update(self):
+        record = self.record
+
+        def update(entity):
+            if not entity.paused:
+                cls = entity.__class__.__name__
+
+                for m in entity.update_methods:
+                    start = perf_counter()
+                    m()
+                    record(
+                        "{}: {}".format(cls, get_method_name(m)),
+                        perf_counter() - start
+                    )
+
+        return update
+
+    def get_report(self):
+        """
+        returns a dict of call counts and millisecond timings per key,
+          sorted by total time spent. The timings are of the last
+          'samples' calls, at most 'window'
+        """
+        report = {}
+
+        for key, times in self.times.items():
+            total = sum(times)
+            report[key] = {
+                "calls": self.counts[key],
+                "samples": len(times),
+                "total": 1000 * total,
+                "mean": 1000 * total / len(times),
+                "max": 1000 * max(times)
+            }
+
+        keys = sorted(report, key=lambda k: -report[k]["total"])
+
+        return {k: report[k] for k in keys}
+
+    def print_report(self):
+        for key, item in self.get_report().items():
+            print("{}\n\tcalls: {}, samples: {}, total: {:.3f}ms, mean: {:.3f}ms, max: {:.3f}ms".format(
+                key, item["calls"], item["samples"], item["total"], item["mean"], item["max"]
+            ))
+
+    def save_report(self, file_name):
+        save_json(self.get_report(), file_name)
@@ -1,5 +1,12 @@
-from os import listdir
-from os.path import join
+import hashlib
+import json
+import marshal
+import mmap
+import struct
+from collections import OrderedDict
+from threading import RLock
+from os import listdir, makedirs, remove, replace, stat, utime
+from os.path import join, exists
 
 import pygame                           # PYGAME CHOKE POINT
 
@@ -12,28 +19,277 @@ IMAGES = join(*Res.IMAGES)
 SOUNDS = join(*Res.SOUNDS)
 STYLES = join(*Res.STYLES)
 TILEMAPS = join(*Res.TILEMAPS)
+CACHE = join(*Res.CACHE)
 
 
-def get_path(directory, file_name):
+def get_asset_bytes(asset):
     """
-    Search for a file in a given directory and its subdirectories
+    memory owned by an Image or pygame Surface's pixels, 0 for other
+      assets and for subsurfaces, which share their parent's pixels
+    """
+    if isinstance(asset, Image):
+        asset = asset.pygame_surface
+
+    if isinstance(asset, pygame.Surface) and not asset.get_parent():
+        w, h = asset.get_size()
+
+        return w * h * asset.get_bytesize()
+
+    return 0
+
+
+ASSET_CACHES = []
+
+
+class AssetCache:
+    """
+    Dict-like LRU cache that evicts the least recently used assets once
+      the byte size of its surfaces exceeds 'budget' or it holds more
+      than 'max_items' assets. Pinned assets are never evicted
+    on_remove(key, value) is called for each asset removed or replaced
+    Every AssetCache is added to ASSET_CACHES, see get_cache_stats()
+    """
+    def __init__(self, name, budget=None, max_items=None, on_remove=None):
+        self.name = name
+        self.budget = budget
+        self.max_items = max_items
+        self.on_remove = on_remove
+
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.pinned = set()
+        self.pinning = False
+        self.lock = RLock()
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        ASSET_CACHES.append(self)
+
+    def __repr__(self):
+        return "AssetCache: {} ({} items, {} bytes)".format(
+            self.name, len(self), self.bytes)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+
+        return value
+
+    def __setitem__(self, key, value):
+        self.add(key, value)
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self.items.get(key)
+
+            if value is None:
+                self.misses += 1
+
+                return default
+
+            self.hits += 1
+            self.items.move_to_end(key)
+            if self.pinning:
+                self.pinned.add(key)
+
+            return value
+
+    def add(self, key, value):
+        with self.lock:
+            if key in self.items:
+                self.remove(key)
+
+            size = get_asset_bytes(value)
+            self.items[key] = value
+            self.sizes[key] = size
+            self.bytes += size
+            if self.pinning:
+                self.pinned.add(key)
+
+            self.evict(key)
+
+    # swaps the asset of a key, e.g. for a converted copy, without
+    #   changing its place in the LRU order, its pin or evicting
+    def replace(self, key, value):
+        with self.lock:
+            size = get_asset_bytes(value)
+            self.items[key] = value
+            self.bytes += size - self.sizes[key]
+            self.sizes[key] = size
+
+    def is_full(self):
+        over_budget = self.budget is not None and self.bytes > self.budget
+        over_items = self.max_items is not None and len(self.items) > self.max_items
+
+        return over_budget or over_items
+
+    # removes least recently used, unpinned assets until the cache
+    #   is back within its limits, 'keep' is never removed
+    def evict(self, keep=None):
+        with self.lock:
+            for key in list(self.items):
+                if not self.is_full():
+                    break
+
+                if key != keep and key not in self.pinned:
+                    self.remove(key)
+                    self.evictions += 1
+
+    def remove(self, key):
+        with self.lock:
+            value = self.items.pop(key)
+            self.bytes -= self.sizes.pop(key)
+            self.pinned.discard(key)
+
+        if self.on_remove:
+            self.on_remove(key, value)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.pinned.clear()
+            self.bytes = 0
+
+    def pin(self, key):
+        self.pinned.add(key)
+
+    def unpin(self, key):
+        self.pinned.discard(key)
+
+    def unpin_all(self):
+        self.pinned.clear()
+        self.evict()
+
+    def get_stats(self):
+        return {
+            "items": len(self.items),
+            "bytes": self.bytes,
+            "budget": self.budget,
+            "pinned": len(self.pinned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def start_pinning():
+    """
+    unpins every asset, then pins each asset used until stop_pinning()
+      is called. Context.load_environment uses this to keep the assets
+      of the live environment from being evicted
     """
+    for cache in ASSET_CACHES:
+        cache.unpin_all()
+        cache.pinning = True
+
+
+def stop_pinning():
+    for cache in ASSET_CACHES:
+        cache.pinning = False
+
+
+def get_cache_stats():
+    return {cache.name: cache.get_stats() for cache in ASSET_CACHES}
+
+
+RESOURCE_INDEX = {}
+RESOURCE_MTIMES = {}        # {directory: {indexed directory: mtime}}
+
+
+def index_directory(directory, index=None, mtimes=None):
+    """
+    Map every file name in a directory and its subdirectories to its path
+    If a file name appears more than once the first path found is kept,
+        in the same order the old recursive search used
+    The mtime of each directory indexed is added to 'mtimes'
+    """
+    if index is None:
+        index = {}
+
+    if mtimes is not None:
+        mtimes[directory] = stat(directory).st_mtime_ns
+
     names = [f for f in listdir(directory) if f[0] not in "._"]
     files = [n for n in names if "." in n]
     dirs = [n for n in names if n not in files]
 
-    if file_name in files:
-        return join(directory, file_name)
+    for f in files:
+        path = join(directory, f)
+
+        if f in index:
+            print("Duplicate resource name '{}'\n\tusing: {}\n\tignoring: {}".format(
+                f, index[f], path
+            ))
+
+        else:
+            index[f] = path
+
+    for d in dirs:
+        index_directory(join(directory, d), index, mtimes)
+
+    return index
+
+
+def refresh_index(directory=None):
+    """
+    Rebuild the file index of one resource directory, or all of them
+    """
+    if directory:
+        mtimes = {}
+        RESOURCE_INDEX[directory] = index_directory(directory, mtimes=mtimes)
+        RESOURCE_MTIMES[directory] = mtimes
 
     else:
-        for d in dirs:
-            try:
-                return get_path(
-                    join(directory, d), file_name)
+        for d in list(RESOURCE_INDEX):
+            refresh_index(d)
+
+
+def is_index_stale(directory):
+    """
+    True if a file or directory was added to or removed from any of
+      the directories indexed since the last refresh_index()
+    """
+    for d, mtime in RESOURCE_MTIMES[directory].items():
+        try:
+            if stat(d).st_mtime_ns != mtime:
+                return True
+
+        except FileNotFoundError:
+            return True
+
+    return False
+
+
+def get_path(directory, file_name):
+    """
+    Search for a file in a given directory and its subdirectories
+    The directory is indexed on first use, and re-indexed if the file
+        isn't found and one of its directories has changed since
+    """
+    if directory not in RESOURCE_INDEX:
+        refresh_index(directory)
+
+    index = RESOURCE_INDEX[directory]
 
-            except FileNotFoundError:
-                pass
+    if file_name not in index and is_index_stale(directory):
+        refresh_index(directory)
+        index = RESOURCE_INDEX[directory]
 
+    if file_name in index:
+        return index[file_name]
+
+    else:
         raise FileNotFoundError(join(directory, file_name))
 
 
@@ -85,7 +341,33 @@ def load_resource(file_name, section=None):
     return get_object(ext, path)
 
 
-LOADED_IMAGES = {}
+def remove_derived(path, image):
+    # region and baked step keys reference their sheet, so an evicted
+    #   sheet's entries have to go too for its surface to be freed
+    for cache in (IMAGE_REGIONS, BAKED_STEPS):
+        with cache.lock:
+            for key in [k for k in cache.items if k[0] is image]:
+                cache.remove(key)
+
+
+LOADED_IMAGES = AssetCache(
+    "images", budget=Res.IMAGE_CACHE_BYTES, on_remove=remove_derived)
+LOADED_JSON = {}
+
+
+def get_json(path):
+    """
+    Parses a JSON file once and returns a fresh copy on every call so
+      callers can mutate the data. The parsed data is kept marshalled,
+      which copies much faster than re-parsing the JSON text. The file
+      is re-parsed if its mtime has changed
+    """
+    mtime = stat(path).st_mtime
+
+    if path not in LOADED_JSON or LOADED_JSON[path][0] != mtime:
+        LOADED_JSON[path] = mtime, marshal.dumps(load_json(path))
+
+    return marshal.loads(LOADED_JSON[path][1])
 
 
 def get_object(ext, path):
@@ -94,18 +376,15 @@ def get_object(ext, path):
       the file extension of the resource being loaded
     """
     if ext == Res.JSON:
-        return load_json(path)
+        return get_json(path)
 
     if ext in Res.IMAGE_EXT:
-        if path in LOADED_IMAGES:
-            return LOADED_IMAGES[path]
+        image = LOADED_IMAGES.get(path)
 
-        else:
-            image = pygame.image.load(path)            # PYGAME CHOKE POINT
-            image = Image(image)
-            LOADED_IMAGES[path] = image
+        if not image:
+            image = add_image(path, pygame.image.load(path))   # PYGAME CHOKE POINT
 
-            return image
+        return image
 
     if ext == Res.TMX:
         return pytmx.TiledMap(path)
@@ -121,46 +400,301 @@ def get_object(ext, path):
         return text
 
 
-LOADED_FONTS = {}
+def add_image(path, surface):
+    """
+    adds a surface loaded from 'path' to LOADED_IMAGES in the display
+      format. Has to run on the main thread, see zs2.preloading
+    """
+    image = Image(surface, path).convert()
+    LOADED_IMAGES.add(path, image)
+
+    return image
+
+
+LOADED_FONTS = AssetCache("fonts", max_items=Res.FONT_CACHE_ITEMS)
 
 
 def get_font(name, size, bold, italic):
     h_key = hash((name, size, bold, italic))
     # PYGAME CHOKE POINT
 
-    if h_key in LOADED_FONTS:
-        return LOADED_FONTS[h_key]
+    font = LOADED_FONTS.get(h_key)
 
-    else:
+    if not font:
         path = pygame.font.match_font(name, bold, italic)
         font = pygame.font.Font(path, size)
-        LOADED_FONTS[h_key] = font
+        LOADED_FONTS.add(h_key, font)
+
+    return font
+
+
+FILE_HASHES = {}
+
+
+def get_file_hash(path):
+    """
+    sha1 hash of a file's contents, only re-read when its mtime changes
+    """
+    mtime = stat(path).st_mtime
+
+    if path in FILE_HASHES and FILE_HASHES[path][0] == mtime:
+        return FILE_HASHES[path][1]
 
-        return font
+    file = open(path, "rb")
+    h = hashlib.sha1(file.read()).hexdigest()
+    file.close()
+    FILE_HASHES[path] = mtime, h
+
+    return h
+
+
+def get_cache_key(*items):
+    """
+    content hash of JSON congruent items and the source files of any
+      Image items. Returns None if an Image wasn't loaded from a file
+    """
+    h = hashlib.sha1()
+
+    for item in items:
+        if isinstance(item, Image):
+            if not item.path:
+                return None
+
+            item = get_file_hash(item.path)
+
+        h.update(json.dumps(item, sort_keys=True, default=str).encode())
+
+    return h.hexdigest()
+
+
+# cached surfaces are saved as a header followed by raw RGB or RGBA
+#   pixels. The header is magic, width, height, bytes per pixel, whether
+#   the surface has a colorkey and the colorkey's RGB
+CACHE_HEADER = struct.Struct("<4sIIBBBBB")
+CACHE_MAGIC = b"ZSS2"
+# {path: size} of the files in CACHE, least recently used first
+CACHE_FILES = OrderedDict()
+
+
+def get_cache_files():
+    if not CACHE_FILES and exists(CACHE):
+        files = []
+
+        for name in listdir(CACHE):
+            if name.endswith(".raw"):
+                path = join(CACHE, name)
+                s = stat(path)
+                files.append((s.st_mtime, path, s.st_size))
+
+        for mtime, path, size in sorted(files):
+            CACHE_FILES[path] = size
+
+    return CACHE_FILES
+
+
+def prune_disk_cache(budget=Res.DISK_CACHE_BYTES):
+    """
+    deletes the least recently used cache files until CACHE fits in
+      the budget
+    """
+    files = get_cache_files()
+    total = sum(files.values())
+
+    while files and total > budget:
+        path, size = files.popitem(last=False)
+        total -= size
+
+        try:
+            remove(path)
+
+        except FileNotFoundError:
+            pass
+
+
+def load_cached_surface(key):
+    """
+    memory maps a surface saved by save_cached_surface(), returns None
+      if there is no cache file for the key or it's truncated or corrupt,
+      so the surface is rendered again
+    """
+    path = join(CACHE, key + ".raw")
+    if not (Res.DISK_CACHE and exists(path)):
+        return None
+
+    if stat(path).st_size <= CACHE_HEADER.size:
+        return None
+
+    file = open(path, "rb")
+    try:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    except (OSError, ValueError):
+        return None
+
+    finally:
+        file.close()
+
+    magic, w, h, depth, keyed, r, g, b = CACHE_HEADER.unpack_from(buffer)
+    if magic != CACHE_MAGIC or depth not in (3, 4) or \
+            len(buffer) != CACHE_HEADER.size + (w * h * depth):
+        return None
+
+    pixels = memoryview(buffer)[CACHE_HEADER.size:]
+    surface = pygame.image.frombuffer(
+        pixels, (w, h), "RGBA" if depth == 4 else "RGB")
+
+    if keyed:
+        surface.set_colorkey((r, g, b))
+
+    # the file's mtime orders prune_disk_cache() across runs
+    files = get_cache_files()
+    if path in files:
+        files.move_to_end(path)
+
+    try:
+        utime(path)
+
+    except OSError:
+        pass
+
+    return surface
+
+
+def save_cached_surface(key, surface):
+    """
+    saves a surface's pixels as RGBA, or as RGB and its colorkey if it
+      has no per pixel alpha, so the loaded surface blits the same way
+    """
+    w, h = surface.get_size()
+    if not (Res.DISK_CACHE and w and h):
+        return
+
+    if surface.get_flags() & pygame.SRCALPHA:
+        depth, colorkey = 4, None
+        pixels = pygame.image.tostring(surface, "RGBA")
+
+    else:
+        depth, colorkey = 3, surface.get_colorkey()
+        pixels = pygame.image.tostring(surface, "RGB")
+
+    r, g, b = colorkey[:3] if colorkey else (0, 0, 0)
+
+    makedirs(CACHE, exist_ok=True)
+    path = join(CACHE, key + ".raw")
+    temp = path + ".tmp"
+
+    file = open(temp, "wb")
+    file.write(CACHE_HEADER.pack(
+        CACHE_MAGIC, w, h, depth, colorkey is not None, r, g, b))
+    file.write(pixels)
+    file.close()
+    replace(temp, path)
+
+    files = get_cache_files()
+    files[path] = CACHE_HEADER.size + len(pixels)
+    files.move_to_end(path)
+    prune_disk_cache()
+
+
+# sub images of sprite sheets and their flips, see Image.get_region()
+IMAGE_REGIONS = AssetCache("image_regions", budget=Res.REGION_CACHE_BYTES)
+# animation steps composited from a sprite sheet's layers, shared by every
+#   entity animated with that sheet, see AnimationGraphics.bake_step()
+BAKED_STEPS = AssetCache("baked_steps", budget=Res.BAKED_STEP_CACHE_BYTES)
+
+
+def get_display_format():
+    """
+    returns (bitsize, masks) of the display surface, or None if no
+      display mode has been set yet
+    """
+    display = pygame.display.get_surface()
+
+    if display:
+        return display.get_bitsize(), display.get_masks()
+
+
+def convert_surface(surface):
+    """
+    returns a copy of a surface in the display's pixel format so that
+      blits don't convert every pixel. Surfaces are returned unchanged
+      while there is no display
+    """
+    if not get_display_format():
+        return surface
+
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+
+    else:
+        return surface.convert()
+
+
+def convert_images():
+    """
+    converts every cached image to the current display format. Called
+      when the display mode is set, since images loaded before that
+      can't be converted
+    """
+    for cache in ASSET_CACHES:
+        with cache.lock:
+            for key, value in list(cache.items.items()):
+                if isinstance(value, Image):
+                    value.convert()
+
+                elif isinstance(value, pygame.Surface):
+                    cache.replace(key, convert_surface(value))
+
+    # regions are subsurfaces of the old, unconverted surfaces
+    IMAGE_REGIONS.clear()
 
 
 class Image:
-    def __init__(self, pygame_surface):
+    def __init__(self, pygame_surface, path=None):
         self.pygame_surface = pygame_surface
         self.get_size = pygame_surface.get_size
+        self.path = path                # source file, for get_cache_key()
+        self.display_format = None      # set by convert()
 
         self._x_flip = None
         self._y_flip = None
         self._xy_flip = None
 
+    def convert(self):
+        display_format = get_display_format()
+
+        if display_format and display_format != self.display_format:
+            surface = convert_surface(self.pygame_surface)
+            self.pygame_surface = surface
+            self.get_size = surface.get_size
+            self.display_format = display_format
+
+            self._x_flip = None
+            self._y_flip = None
+            self._xy_flip = None
+
+        return self
+
+    # images made from this image's surface share its pixel format
+    def get_derived(self, surface):
+        image = Image(surface)
+        image.display_format = self.display_format
+
+        return image
+
     def flip(self, x, y):
         x_flip = x and not y
         y_flip = y and not x
         xy_flip = x and y
 
         if x_flip and not self._x_flip:
-            self._x_flip = Image(pygame.transform.flip(self.pygame_surface, x, y))
+            self._x_flip = self.get_derived(pygame.transform.flip(self.pygame_surface, x, y))
 
         if y_flip and not self._y_flip:
-            self._y_flip = Image(pygame.transform.flip(self.pygame_surface, x, y))
+            self._y_flip = self.get_derived(pygame.transform.flip(self.pygame_surface, x, y))
 
         if xy_flip and not self._xy_flip:
-            self._xy_flip = Image(pygame.transform.flip(self.pygame_surface, x, y))
+            self._xy_flip = self.get_derived(pygame.transform.flip(self.pygame_surface, x, y))
 
         return {
             (True, False): self._x_flip,
@@ -169,7 +703,27 @@ class Image:
         }[(x, y)]
 
     def subsurface(self, rect):
-        return Image(self.pygame_surface.subsurface(rect.pygame_rect))
+        return self.get_derived(self.pygame_surface.subsurface(rect.pygame_rect))
+
+    # returns a cached, optionally mirrored, sub image shared by every
+    #   entity drawing the same region of this image
+    def get_region(self, rect, mirror=(False, False)):
+        mirror_x, mirror_y = mirror
+        key = (
+            self, tuple(rect.position), tuple(rect.size),
+            bool(mirror_x), bool(mirror_y)
+        )
+        image = IMAGE_REGIONS.get(key)
+
+        if not image:
+            if mirror_x or mirror_y:
+                image = self.get_region(rect).flip(mirror_x, mirror_y)
+            else:
+                image = self.subsurface(rect)
+
+            IMAGE_REGIONS.add(key, image)
+
+        return image
 
     def get_scaled(self, scale):
         w, h = self.get_size()
@@ -178,7 +732,7 @@ class Image:
         size = int(w), int(h)
         image = pygame.transform.scale(self.pygame_surface, size)
 
-        return Image(image)
+        return self.get_derived(image)
 
     def fill(self, *args):
         self.pygame_surface.fill(*args)
@@ -0,0 +1,421 @@
+"""
+Compact binary snapshots of JSON congruent game state, e.g. the output
+  of Context.get_json()
+
+Values are stored by column rather than one at a time, so loading is a
+  few bulk array reads per column instead of a branch per value. A list
+  is a column of its items and a list of dicts with the same keys is a
+  table with a column per key, so the positions of every sprite are read
+  as one packed int array
+
+snapshot = header, string table, shape table, column of the root value
+header = MAGIC, schema version (varint), schema name (varint length,
+  utf-8)
+string table = count (varint), character lengths (ints), utf-8 of every
+  string joined (varint byte length, bytes)
+shape table = count (varint), then each dict shape as key count
+  (varint) + key string indices (varints)
+ints = width code byte + little endian array of 1, 2, 4 or 8 byte ints,
+  the column length is known from the enclosing column
+
+column of n values = kind byte followed by:
+  NONE                  nothing
+  BOOL                  n bytes
+  INT                   ints
+  FLOAT                 n 8 byte little endian doubles
+  STR                   string table indices (ints)
+  BIG_INT               string table indices (ints) of ints that don't
+                          fit in 8 bytes, saved as decimal strings
+  LIST                  lengths (ints), column of every item joined
+  DICT                  shape indices (ints), shapes used (varint), then
+                          for each: shape index (varint), a column per
+                          key of the dicts with that shape
+  MIXED                 n kind bytes, then a column for each kind used,
+                          in kind order, of the values of that kind
+
+Every string (entity names, class names, etc.) is stored once in the
+  string table. Tuples are saved as lists and dict keys must be strings,
+  as with JSON
+"""
+from array import array
+from itertools import accumulate, islice
+from sys import byteorder
+
+MAGIC = b"ZSS\x02"
+SCHEMA = "zs2.context"
+SCHEMA_VERSION = 2
+
+NONE, BOOL, INT, FLOAT, STR, BIG_INT, LIST, DICT, MIXED = range(9)
+KINDS = {
+    type(None): NONE, bool: BOOL, int: INT, float: FLOAT, str: STR,
+    list: LIST, tuple: LIST, dict: DICT
+}
+
+INT_TYPES = "bhiq"
+INT_LIMITS = [1 << (array(t).itemsize * 8 - 1) for t in INT_TYPES]
+SWAP = byteorder != "little"
+
+
+def write_varint(buffer, n):
+    while n > 0x7f:
+        buffer.append((n & 0x7f) | 0x80)
+        n >>= 7
+
+    buffer.append(n)
+
+
+def read_varint(data, i):
+    n = 0
+    shift = 0
+
+    while True:
+        if i >= len(data):
+            raise ValueError("snapshot is truncated")
+
+        b = data[i]
+        i += 1
+        n |= (b & 0x7f) << shift
+
+        if b < 0x80:
+            return n, i
+
+        shift += 7
+
+
+def get_array(type_code, values=()):
+    a = array(type_code, values)
+    if SWAP:
+        a.byteswap()
+
+    return a
+
+
+class SnapshotWriter:
+    def __init__(self):
+        self.strings = {}
+        self.shapes = {}
+        self.buffer = bytearray()
+
+    def get_string_index(self, s):
+        strings = self.strings
+        i = strings.get(s)
+
+        if i is None:
+            i = strings[s] = len(strings)
+
+        return i
+
+    def get_shape_index(self, keys):
+        i = self.shapes.get(keys)
+
+        if i is None:
+            for key in keys:
+                if type(key) is not str:
+                    raise ValueError(
+                        "snapshot dict keys must be strings: {}".format(key))
+
+            i = self.shapes[keys] = len(self.shapes)
+
+        return i
+
+    def write_ints(self, values):
+        lo = min(values, default=0)
+        hi = max(values, default=0)
+
+        for code, limit in enumerate(INT_LIMITS):
+            if -limit <= lo and hi < limit:
+                self.buffer.append(code)
+                self.buffer += get_array(INT_TYPES[code], values).tobytes()
+
+                return
+
+        raise ValueError("int out of range for a snapshot column")
+
+    def write_column(self, values):
+        get_kind = KINDS.get
+        kinds = [get_kind(type(v)) for v in values]
+        kind = kinds[0] if kinds else NONE
+
+        if kinds.count(kind) != len(kinds) or kind is None:
+            self.write_mixed(values, kinds)
+
+        elif kind == INT and not (
+                -INT_LIMITS[-1] <= min(values) and max(values) < INT_LIMITS[-1]):
+            self.write_mixed(values, kinds)
+
+        else:
+            self.buffer.append(kind)
+            self.write_values(kind, values)
+
+    def write_values(self, kind, values):
+        buffer = self.buffer
+
+        if kind == BOOL:
+            buffer += bytes(values)
+
+        elif kind == INT:
+            self.write_ints(values)
+
+        elif kind == FLOAT:
+            buffer += get_array("d", values).tobytes()
+
+        elif kind == STR:
+            get_index = self.get_string_index
+            self.write_ints([get_index(s) for s in values])
+
+        elif kind == BIG_INT:
+            get_index = self.get_string_index
+            self.write_ints([get_index(str(n)) for n in values])
+
+        elif kind == LIST:
+            self.write_ints([len(v) for v in values])
+            items = []
+            for v in values:
+                items += v
+            self.write_column(items)
+
+        elif kind == DICT:
+            self.write_dicts(values)
+
+    def write_dicts(self, values):
+        get_shape_index = self.get_shape_index
+        shape_ids = [get_shape_index(tuple(d)) for d in values]
+        self.write_ints(shape_ids)
+
+        groups = {}
+        for i, d in zip(shape_ids, values):
+            if i not in groups:
+                groups[i] = []
+            groups[i].append(d)
+
+        write_varint(self.buffer, len(groups))
+        shapes = list(self.shapes)
+        for i, rows in groups.items():
+            write_varint(self.buffer, i)
+
+            for key in shapes[i]:
+                self.write_column([d[key] for d in rows])
+
+    def write_mixed(self, values, kinds):
+        kinds = list(kinds)
+
+        for i, v in enumerate(values):
+            kind = kinds[i]
+
+            if kind is None:
+                raise ValueError("can't save {} in a snapshot".format(v))
+
+            if kind == INT and not -INT_LIMITS[-1] <= v < INT_LIMITS[-1]:
+                kinds[i] = BIG_INT
+
+        self.buffer.append(MIXED)
+        self.buffer += bytes(kinds)
+
+        for kind in sorted(set(kinds)):
+            self.buffer.append(kind)
+            self.write_values(kind, [v for k, v in zip(kinds, values) if k == kind])
+
+    def get_bytes(self, value):
+        self.write_column([value])
+        body = self.buffer
+
+        # the tables are only complete once the body is written
+        self.buffer = bytearray()
+        shapes = self.shapes
+        keys = [[self.get_string_index(k) for k in s] for s in shapes]
+
+        strings = list(self.strings)
+        self.buffer += MAGIC
+        write_varint(self.buffer, SCHEMA_VERSION)
+        schema = SCHEMA.encode()
+        write_varint(self.buffer, len(schema))
+        self.buffer += schema
+
+        write_varint(self.buffer, len(strings))
+        self.write_ints([len(s) for s in strings])
+        text = "".join(strings).encode()
+        write_varint(self.buffer, len(text))
+        self.buffer += text
+
+        write_varint(self.buffer, len(keys))
+        for indices in keys:
+            write_varint(self.buffer, len(indices))
+            for i in indices:
+                write_varint(self.buffer, i)
+
+        return bytes(self.buffer + body)
+
+
+class SnapshotReader:
+    def __init__(self, data):
+        self.data = data
+        self.i = 0
+        self.strings = []
+        self.shapes = []
+
+    def read_varint(self):
+        n, self.i = read_varint(self.data, self.i)
+
+        return n
+
+    def read_bytes(self, n):
+        i = self.i
+        self.i += n
+
+        if self.i > len(self.data):
+            raise ValueError("snapshot is truncated")
+
+        return self.data[i:self.i]
+
+    def read_ints(self, n):
+        code = self.read_bytes(1)[0]
+        if code >= len(INT_TYPES):
+            raise ValueError("bad snapshot int width {}".format(code))
+
+        a = array(INT_TYPES[code])
+        a.frombytes(self.read_bytes(n * a.itemsize))
+        if SWAP:
+            a.byteswap()
+
+        return a.tolist()
+
+    def read_header(self):
+        if bytes(self.data[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a ZSquirrel snapshot (or an old version)")
+        self.i = len(MAGIC)
+
+        version = self.read_varint()
+        schema = bytes(self.read_bytes(self.read_varint())).decode()
+        if schema != SCHEMA or version != SCHEMA_VERSION:
+            raise ValueError("unsupported snapshot schema: {} v{}".format(
+                schema, version))
+
+        count = self.read_varint()
+        lengths = self.read_ints(count)
+        text = bytes(self.read_bytes(self.read_varint())).decode()
+        ends = list(accumulate(lengths))
+        self.strings = [text[e - n:e] for e, n in zip(ends, lengths)]
+
+        shapes = []
+        for x in range(self.read_varint()):
+            keys = [self.read_varint() for y in range(self.read_varint())]
+            shapes.append([self.strings[k] for k in keys])
+        self.shapes = shapes
+
+    def read_column(self, n):
+        kind = self.read_bytes(1)[0]
+
+        if kind == MIXED:
+            kinds = self.read_bytes(n)
+            columns = {}
+
+            for k in sorted(set(kinds)):
+                if self.read_bytes(1)[0] != k:
+                    raise ValueError("bad snapshot column at byte {}".format(self.i))
+
+                columns[k] = iter(self.read_values(k, kinds.count(k)))
+
+            return [next(columns[k]) for k in kinds]
+
+        return self.read_values(kind, n)
+
+    def read_values(self, kind, n):
+        if kind == NONE:
+            return [None] * n
+
+        if kind == BOOL:
+            return list(map(bool, self.read_bytes(n)))
+
+        if kind == INT:
+            return self.read_ints(n)
+
+        if kind == FLOAT:
+            a = array("d")
+            a.frombytes(self.read_bytes(n * a.itemsize))
+            if SWAP:
+                a.byteswap()
+
+            return a.tolist()
+
+        if kind == STR:
+            return list(map(self.strings.__getitem__, self.read_ints(n)))
+
+        if kind == BIG_INT:
+            return [int(self.strings[i]) for i in self.read_ints(n)]
+
+        if kind == LIST:
+            lengths = self.read_ints(n)
+            items = iter(self.read_column(sum(lengths)))
+
+            # lists of the same length, e.g. positions, are split in C
+            if lengths and lengths.count(lengths[0]) == n:
+                if not lengths[0]:
+                    return [[] for x in range(n)]
+
+                return list(map(list, zip(*[items] * lengths[0])))
+
+            return [list(islice(items, k)) for k in lengths]
+
+        if kind == DICT:
+            return self.read_dicts(n)
+
+        raise ValueError("bad snapshot column kind {} at byte {}".format(
+            kind, self.i - 1))
+
+    def read_dicts(self, n):
+        shape_ids = self.read_ints(n)
+        groups = {}
+
+        for x in range(self.read_varint()):
+            i = self.read_varint()
+            keys = self.shapes[i]
+            count = shape_ids.count(i)
+            columns = [self.read_column(count) for k in keys]
+
+            groups[i] = map(dict, map(zip, [keys] * count, zip(*columns)))
+            if not keys:
+                groups[i] = iter([{} for x in range(count)])
+
+        if len(groups) == 1:
+            return list(groups.popitem()[1])
+
+        return [next(groups[i]) for i in shape_ids]
+
+    def get_value(self):
+        self.read_header()
+
+        return self.read_column(1)[0]
+
+
+def dump_snapshot(d):
+    """
+    returns JSON congruent data as snapshot bytes
+    """
+    return SnapshotWriter().get_bytes(d)
+
+
+def load_snapshot(data):
+    """
+    returns the data saved in snapshot bytes
+    """
+    return SnapshotReader(data).get_value()
+
+
+def save_snapshot(d, file_name):
+    """
+    saves JSON congruent data as a binary snapshot file
+    """
+    file = open(file_name, "wb")
+    file.write(dump_snapshot(d))
+    file.close()
+
+
+def load_snapshot_file(file_name):
+    """
+    loads the data saved in a binary snapshot file
+    """
+    file = open(file_name, "rb")
+    data = file.read()
+    file.close()
+
+    return load_snapshot(data)
@@ -9,10 +9,25 @@ def load_zson(file_name):
     loads ZSON formatted file as dict object
     """
     file = open(file_name, "r")
-    text = file.read()
+    d = parse_zson(file)
     file.close()
 
-    return get_zson_data(text)
+    return d
+
+
+def stream_zson(file_name, ordered=False, warning=True):
+    """
+    yields (section_name, item_name, item) records from a ZSON file
+      without loading the whole file, see read_zson()
+    """
+    file = open(file_name, "r")
+
+    try:
+        for record in read_zson(file, ordered=ordered, warning=warning):
+            yield record
+
+    finally:
+        file.close()
 
 
 def save_zson(d, file_name, p=False):
@@ -20,13 +35,22 @@ def save_zson(d, file_name, p=False):
     saves a ZSON congruent dict object as ZSON syntax ''*.zson' file
     """
     file = open(file_name, "w")
+    write_zson(d, file, p=p)
+    file.close()
 
-    text = format_zson(d, p=p)
-    if p:
-        print(text)
 
-    file.write(text)
-    file.close()
+def write_zson(d, file, p=False):
+    """
+    writes a ZSON congruent dict object to a file object, streaming
+      each formatted chunk instead of building the whole text
+    """
+    write = file.write
+
+    for chunk in iter_zson(d):
+        write(chunk)
+
+        if p:
+            print(chunk, end="")
 
 
 def load_json(file_name):
@@ -106,12 +130,7 @@ def format_zson(d, p=False):
     """
     formats ZSON congruent dict items to ZSON formatted string
     """
-    text = ""
-
-    for section in d:
-        text += "# " + section + "\n\n"
-
-        text += format_dict(d[section])
+    text = "".join(iter_zson(d))
 
     if p:
         print(text)
@@ -119,37 +138,57 @@ def format_zson(d, p=False):
     return text
 
 
+def iter_zson(d):
+    """
+    yields the ZSON formatted text of a ZSON congruent dict in chunks
+    """
+    for section in d:
+        yield "# " + section + "\n\n"
+
+        for chunk in iter_dict(d[section]):
+            yield chunk
+
+
 def format_dict(d, t=0):
     """
     formats dict items to string with recursive indentation
     """
-    output = ""
-    tab = "\t" * t
+    return "".join(iter_dict(d, t=t))
+
 
-    # method converts Python str repr for
-    # False, True, and None to JSON style:
-    # false, true, null
-    def get_str(x):
-        s = str(x)
+# method converts Python str repr for
+# False, True, and None to JSON style:
+# false, true, null
+KEYWORDS = {
+    "True": Zson.TRUE_KEYWORD,
+    "False": Zson.FALSE_KEYWORD,
+    "None": Zson.NONE_KEYWORD
+}
 
-        if s == "True":
-            s = "true"
 
-        if s == "None":
-            s = "null"
+def get_str(x):
+    s = str(x)
 
-        if s == "False":
-            s = "false"
+    return KEYWORDS.get(s, s)
 
-        return s
+
+def iter_dict(d, t=0):
+    """
+    yields the formatted lines of dict items with recursive indentation
+    """
+    tab = "\t" * t
 
     for key in d:
         value = d[key]
 
         # recursive call for dicts within dicts
         if isinstance(value, dict):
-            output += "\n" + tab + str(key) + "\n"
-            output += format_dict(value, t=t + 1) + "\n"
+            yield "\n" + tab + str(key) + "\n"
+
+            for chunk in iter_dict(value, t=t + 1):
+                yield chunk
+
+            yield "\n"
 
         else:
             if type(value) is list:
@@ -161,9 +200,76 @@ def format_dict(d, t=0):
                 # if "," in rhs:
                 #     rhs = "\"{}\"".format(rhs)
 
-            output += tab + str(key) + ": " + rhs + "\n"
+            yield tab + str(key) + ": " + rhs + "\n"
+
+
+# ZSON token types
+SECTION = "section"         # '# section_name'
+ITEM = "item"               # 'item_name'
+PARAM = "param"             # '\tparameter' or '\tparameter: value'
+
+
+def report_zson_error(error_type, number, line, warning=True):
+    msg = "ERROR in ZSON syntax: {}\n line {}: '{}'".format(
+        error_type, number, line)
+
+    if warning:
+        print("\n\nZ SQUIRREL WARNING!!!\n" + msg)
+
+    else:
+        raise ValueError(msg)
+
+
+def tokenize_zson(lines, warning=True):
+    """
+    single pass over ZSON lines, yielding (line_number, token_type, value)
+      SECTION and ITEM values are names, PARAM values are (key, value)
+      pairs. Lines with bad syntax are reported and skipped, or raise
+      ValueError if warning=False
+    """
+    for number, line in enumerate(lines, 1):
+        if line[-1:] == "\n":
+            line = line[:-1]
+
+        if not line or line.isspace():
+            continue
+
+        first = line[0]
+
+        # section header                    '# section_header'
+        if first == "#":
+            if line[1:2] == " " and len(line) > 2:
+                yield number, SECTION, line[2:]
+
+            else:
+                report_zson_error("Bad section header", number, line, warning)
+
+        # parameter                         '\tparameter'
+        #                                   '\tparameter: value'
+        elif first == "\t":
+            if ":" not in line:
+                yield number, PARAM, (string_to_value(line[1:]), True)
+
+            else:
+                parts = line.split(":")
+                key, sep, value = line[1:].partition(": ")
+                bad = (
+                    parts[0].isspace() or parts[1].isspace() or
+                    line[-1] == ":" or not sep
+                )
+
+                if bad:
+                    report_zson_error("Bad parameter expression", number, line, warning)
+
+                else:
+                    yield number, PARAM, (key, string_to_value(value))
+
+        # item header                       'item name'
+        elif first.isspace():
+            report_zson_error("Bad item header", number, line, warning)
 
-    return output
+        else:
+            yield number, ITEM, line
 
 
 def check_zson_syntax(s, warning=True, p=False):
@@ -172,53 +278,11 @@ def check_zson_syntax(s, warning=True, p=False):
       optionally raises ValueError or warnings
     returns string if OK, or 'corrected' string if warning=True
     """
-    sections = s.split("#")
+    lines = s.split("\n")
     output = []
 
-    for section in [s for s in sections if s]:
-        lines = [l for l in section.split("\n") if l]
-
-        for line in lines:
-            ignore = line.isspace() or line == ""
-
-            if not ignore:
-                syntax_error = False
-                error_type = ""
-
-                # check section header syntax       '# section_header'
-                if line == lines[0]:
-                    if not (line[0] == " " and len(line) > 1):
-                        syntax_error = True
-                        error_type = "Bad section header"
-
-                # check item header syntax          'item name'
-                elif line[0] != "\t" and line[0].isspace():
-                    syntax_error = True
-                    error_type = "Bad item header"
-
-                # check parameter syntax            '\tparameter'
-                #                                   '\tparameter: value'
-                if line[0] == "\t" and ":" in line:
-                    blank_name = line.split(":")[0].isspace() or line.split(":")[1].isspace()
-                    blank_value = (line[-1] == ":")
-                    if blank_value or blank_name:
-                        syntax_error = True
-                        error_type = "Bad parameter expression"
-
-                if not syntax_error:
-                    if line == lines[0]:
-                        line = "#" + line
-                    output.append(line)
-
-                else:
-                    msg = "ERROR in ZSON syntax: {}\n line: '{}'".format(
-                        error_type, line)
-
-                    if warning:
-                        print("\n\nZ SQUIRREL WARNING!!!\n" + msg)
-
-                    else:
-                        raise ValueError(msg)
+    for number, token, value in tokenize_zson(lines, warning):
+        output.append(lines[number - 1])
 
     text = "\n".join(output)
 
@@ -228,63 +292,128 @@ def check_zson_syntax(s, warning=True, p=False):
     return text
 
 
-def get_zson_data(s, ordered=False):
+def get_zson_data(s, ordered=False, warning=True):
     """
     get a dict object from a ZSON formatted string
     """
-    sections = check_zson_syntax(s).split("# ")
+    return parse_zson(s.split("\n"), ordered=ordered, warning=warning)
+
+
+def parse_zson(lines, ordered=False, warning=True):
+    """
+    get a dict object from an iterable of ZSON formatted lines
+    """
     d = {}
+    dict_type = dict
+    section = None
+    item = None
 
-    for section in (s for s in sections if s):
-        name = section.split("\n")[0]
-        body = section[len(name):]
+    for number, token, value in tokenize_zson(lines, warning):
+        if token == PARAM:
+            if section is None:
+                report_zson_error("Parameter outside of section", number, value, warning)
 
-        # automatically order sections specified by zs_globals.py
-        if not ordered:
-            ordered = name in Zson.ORDERED_SECTIONS
+            else:
+                # parameters before the first item header
+                #   belong to the first item
+                if item is None:
+                    item = dict_type()
+
+                key, v = value
+                item[key] = v
+
+        elif token == ITEM:
+            if section is None:
+                report_zson_error("Item outside of section", number, value, warning)
+
+            else:
+                if not section:
+                    pending = item
+                else:
+                    pending = None
+
+                item = pending or dict_type()
+
+                # the first item with a given name is kept
+                if value not in section:
+                    section[value] = item
+
+        else:
+            # automatically order sections specified by zs_constants.py
+            if ordered or value in Zson.ORDERED_SECTIONS:
+                dict_type = OrderedDict
+            else:
+                dict_type = dict
 
-        d[name] = get_section(body, ordered=ordered)
+            section = dict_type()
+            item = None
+            d[value] = section
 
     return d
 
 
-def get_section(s, ordered=False):
+def read_zson(lines, ordered=False, warning=True):
     """
-    get a dict object from a single section of a CFG formatted string
+    yields (section_name, item_name, item) for each item in a file handle
+      or other iterable of ZSON lines as soon as the item is complete, so
+      only one item is held in memory at a time. Unlike parse_zson()
+      items with a repeated name are all yielded, and empty sections
+      yield nothing
     """
-    lines = [l for l in s.split("\n") if l]
+    dict_type = dict
+    section = None
+    name = None
+    item = None
 
-    item_strings = []
-    item_names = []
-    current = ""
+    for number, token, value in tokenize_zson(lines, warning):
+        if token == PARAM:
+            if section is None:
+                report_zson_error("Parameter outside of section", number, value, warning)
 
-    for line in lines:
-        # find item headers
-        header = not line[0] == "\t"
+            else:
+                # parameters before the first item header
+                #   belong to the first item
+                if item is None:
+                    item = dict_type()
 
-        if header:
-            item_names.append(line)
+                key, v = value
+                item[key] = v
+
+        elif token == ITEM:
+            if section is None:
+                report_zson_error("Item outside of section", number, value, warning)
+
+            else:
+                if name is not None:
+                    yield section, name, item
+                    item = None
 
-            if len(item_names) > 1:
-                # find parameters for current item
-                item_strings.append(current)
-                current = ""
+                name = value
+                if item is None:
+                    item = dict_type()
 
         else:
-            current += line + "\n"
+            if name is not None:
+                yield section, name, item
 
-    # add remaining item parameters
-    item_strings.append(current)
+            if ordered or value in Zson.ORDERED_SECTIONS:
+                dict_type = OrderedDict
+            else:
+                dict_type = dict
+
+            section = value
+            name = None
+            item = None
 
-    # make section dict an OrderedDict if flag is set
-    section = {True: OrderedDict(), False: {}}[ordered]
+    if name is not None:
+        yield section, name, item
 
-    for name in item_names:
-        i = item_names.index(name)
-        item_str = item_strings[i]
-        section[name] = get_item(item_str, ordered=ordered)
 
-    return section
+def get_section(s, ordered=False):
+    """
+    get a dict object from a single section of a ZSON formatted string
+    """
+    return parse_zson(["# section"] + s.split("\n"), ordered=ordered)["section"]
 
 
 def get_item(s, ordered=False):
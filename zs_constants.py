@@ -1,6 +1,10 @@
 class Settings:
     FRAME_RATE = 60
+    UPDATE_RATE = None      # fixed simulation Hz, None updates once per frame
+    MAX_UPDATE_STEPS = 5
     SCREEN_SIZE = 800, 600
+    BATCH_RENDER = True     # PygameScreen submits images with Surface.blits
+    DIRTY_RECTS = False     # PygameScreen only redraws changed regions
     APP_START = "start.json"
     DEFAULT_STYLE = "default_style.json"
 
@@ -12,6 +16,10 @@ class Settings:
     HUD_CACHE_SIZE = 60
     HUD_FRAME_RULE = 10
 
+    PROFILE_WINDOW = 300    # calls kept per key by zs2.profiling.Profiler
+    PRELOAD_WORKERS = 4     # threads used by zs2.preloading.Preloader
+    DELTA_BUFFER = 600      # frames kept by zs2.deltas.DeltaRecorder
+
 
 class ControllerInputs:
     CONTROLLER_FRAME_DEPTH = 300
@@ -33,10 +41,20 @@ class Resources:
     SOUNDS = RESOURCES, "sounds"
     STYLES = RESOURCES, "styles"
     TILEMAPS = RESOURCES, "tilemaps"
+    CACHE = RESOURCES, "_cache"     # '_' keeps get_path() out of it
 
     IMAGE_EXT = "gif", "png", "jpg", "svg", "bmp", "ico"
     SOUND_EXT = ".wav", ".mp3", ".ogg", ".flac"
 
+    # AssetCache budgets, see zs2.resources
+    IMAGE_CACHE_BYTES = 256 * 1024 * 1024       # LOADED_IMAGES
+    REGION_CACHE_BYTES = 32 * 1024 * 1024       # Image.get_region() cache
+    BAKED_STEP_CACHE_BYTES = 64 * 1024 * 1024   # AnimationGraphics.bake_step() cache
+    PRE_RENDER_CACHE_BYTES = 64 * 1024 * 1024   # ContainerGraphics.PRE_RENDERS
+    FONT_CACHE_ITEMS = 64                       # LOADED_FONTS
+    DISK_CACHE = True                           # save pre-rendered surfaces to CACHE
+    DISK_CACHE_BYTES = 256 * 1024 * 1024        # least recently used files past this are deleted
+
 
 class ApiConstants:
     # object method prefixes
@@ -50,6 +68,9 @@ class Zson:
     TRUE_KEYWORD = "true"
     NONE_KEYWORD = "null"
 
+    # sections parsed as OrderedDicts
+    ORDERED_SECTIONS = ()
+
 
 class ZsData:
     # built in keywords